@@ -1,11 +1,11 @@
 import streamlit as st
 from utils.auth import authenticate_user
-from utils.db import init_db
+from utils.db import ensure_db
 import time
 import os
 
-# Initialize database
-init_db()
+# Initialize database (once per process)
+ensure_db()
 
 # Configure page
 st.set_page_config(
@@ -1,6 +1,5 @@
 import streamlit as st
-from utils.db import get_db_connection
-import pandas as pd
+from utils.db import cached_query
 
 
 def get_dashboard_file(role):
@@ -107,13 +106,11 @@ st.markdown("---")
 # Dashboard Tabs
 st.markdown("## Asset Overview")
 
-conn = get_db_connection()
-assets = pd.read_sql("""
+assets = cached_query("""
     SELECT name as ASSET, status as STATUS, 
            location as LOCATION, alerts as ALERTS 
     FROM assets
-""", conn)
-conn.close()
+""", ['assets'])
 
 st.dataframe(
     assets.style.applymap(
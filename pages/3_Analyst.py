@@ -1,4 +1,5 @@
 import streamlit as st
+from utils.jobs import WARM_START_TREES, list_jobs, serving_model_key, submit_deploy, submit_retrain
 
 
 def get_dashboard_file(role):
@@ -91,22 +92,28 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-col1, col2, col3 = st.columns(3)
-with col1:
-    if st.button("Confirm"):
-        st.success("Insight confirmed and added to knowledge base!")
-with col2:
-    if st.button("Decline"):
-        st.warning("Insight declined and marked for review.")
-with col3:
-    if st.button("Compare Similar Cases"):
-        st.info("Loading similar cases...")
-        st.markdown("""
-        **Similar Cases Found:**
-        - Case #2024-045: Bearing failure at 12.3% deviation (2024-08-15)
-        - Case #2024-032: Bearing failure at 11.8% deviation (2024-07-22)
-        - Case #2024-018: Bearing failure at 12.1% deviation (2024-06-10)
-        """)
+# Interactive sections are fragments, so a click reruns only its own section
+@st.fragment
+def show_insight_actions():
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("Confirm"):
+            st.success("Insight confirmed and added to knowledge base!")
+    with col2:
+        if st.button("Decline"):
+            st.warning("Insight declined and marked for review.")
+    with col3:
+        if st.button("Compare Similar Cases"):
+            st.info("Loading similar cases...")
+            st.markdown("""
+            **Similar Cases Found:**
+            - Case #2024-045: Bearing failure at 12.3% deviation (2024-08-15)
+            - Case #2024-032: Bearing failure at 11.8% deviation (2024-07-22)
+            - Case #2024-018: Bearing failure at 12.1% deviation (2024-06-10)
+            """)
+
+
+show_insight_actions()
 
 st.markdown("## Active Models")
 col1, col2 = st.columns(2)
@@ -125,20 +132,41 @@ with col2:
     </div>
     """, unsafe_allow_html=True)
 
-col1, col2, col3 = st.columns(3)
-with col1:
-    if st.button("Retrain Selected Model"):
-        st.success("Model retraining initiated! Estimated completion: 2 hours")
-with col2:
-    if st.button("Deploy New Model"):
-        st.success("New model deployment started! Will be active in 30 minutes")
-with col3:
-    if st.button("Model Performance Alerts"):
-        st.info("Model Performance Alerts:")
-        st.markdown("""
-        - Vibration Analysis v3.2: Performance dropped 2% in last week
-        - Thermal Anomaly Detector v2.1: 5 false positives detected
-        """)
+@st.fragment
+def show_solar_model_controls():
+    st.markdown(f"""
+    <div class="metric-card">
+        <p><strong>Solar Generation Anomaly Detector</strong></p>
+        <p>Serving: {serving_model_key() or "not trained yet"}</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("Retrain Selected Model"):
+            job_id = submit_retrain()
+            st.success(f"Retraining queued as job #{job_id}: {WARM_START_TREES} trees will be added to the serving model")
+    with col2:
+        if st.button("Deploy New Model"):
+            job_id = submit_deploy()
+            if job_id is None:
+                st.info("No newly trained model to deploy")
+            else:
+                st.success(f"Deployment queued as job #{job_id}: scores switch over once rescoring finishes")
+    with col3:
+        if st.button("Model Performance Alerts"):
+            st.info("Model Performance Alerts:")
+            st.markdown("""
+            - Vibration Analysis v3.2: Performance dropped 2% in last week
+            - Thermal Anomaly Detector v2.1: 5 false positives detected
+            """)
+
+    with st.expander("Model Jobs"):
+        st.button("Refresh Jobs")
+        st.dataframe(list_jobs(), use_container_width=True, hide_index=True)
+
+
+show_solar_model_controls()
 
 st.markdown("## Quick Analysis Types")
 st.markdown("""
@@ -148,21 +176,26 @@ st.markdown("""
 """)
 
 st.markdown("## Recent Templates")
-if st.button("Wind Speed vs. Gearbox Failures"):
-    st.info("Loading Wind Speed vs. Gearbox Failures analysis...")
-    st.markdown("""
-    **Analysis Results:**
-    - Correlation coefficient: 0.73
-    - High wind speeds (>15 m/s) increase failure risk by 45%
-    - Recommended: Increase inspection frequency during high wind periods
-    """)
-
-if st.button("Time-to-Repair by Technician"):
-    st.info("Loading Time-to-Repair analysis...")
-    st.markdown("""
-    **Technician Performance:**
-    - John Smith: Average repair time 2.3 hours
-    - Sarah Johnson: Average repair time 1.8 hours
-    - Mike Wilson: Average repair time 2.7 hours
-    - Recommended: Assign Sarah to critical repairs
-    """)
+@st.fragment
+def show_recent_templates():
+    if st.button("Wind Speed vs. Gearbox Failures"):
+        st.info("Loading Wind Speed vs. Gearbox Failures analysis...")
+        st.markdown("""
+        **Analysis Results:**
+        - Correlation coefficient: 0.73
+        - High wind speeds (>15 m/s) increase failure risk by 45%
+        - Recommended: Increase inspection frequency during high wind periods
+        """)
+
+    if st.button("Time-to-Repair by Technician"):
+        st.info("Loading Time-to-Repair analysis...")
+        st.markdown("""
+        **Technician Performance:**
+        - John Smith: Average repair time 2.3 hours
+        - Sarah Johnson: Average repair time 1.8 hours
+        - Mike Wilson: Average repair time 2.7 hours
+        - Recommended: Assign Sarah to critical repairs
+        """)
+
+
+show_recent_templates()
@@ -1,6 +1,6 @@
 import streamlit as st
-import pandas as pd
-from utils.db import get_db_connection, hash_password
+from utils.db import cached_query, get_db_connection, hash_password
+from utils.writer import submit_write, submit_write_many
 import sqlite3
 
 
@@ -99,24 +99,21 @@ with tab1:
         ])
 
         if st.form_submit_button("Create User"):
-            conn = get_db_connection()
             try:
                 hashed_pass = hash_password(new_pass)
-                conn.execute(
+                submit_write(
                     "INSERT INTO users (email, password, role) VALUES (?, ?, ?)",
                     (new_email, hashed_pass, new_role)
-                )
-                conn.commit()
+                ).result()
                 st.success(f"User {new_email} created successfully!")
             except sqlite3.IntegrityError:
                 st.error("Email already exists")
-            finally:
-                conn.close()
+            except sqlite3.OperationalError as e:
+                st.error(f"Could not create user: {str(e)}")
 
 with tab2:
     st.subheader("Current Users")
-    conn = get_db_connection()
-    users = pd.read_sql("SELECT email, role FROM users", conn)
+    users = cached_query("SELECT email, role FROM users", ['users'])
 
     selected_emails = st.multiselect(
         "Select users to delete:",
@@ -125,17 +122,16 @@ with tab2:
     )
 
     if st.button("Delete Selected", type="primary"):
-        deleted_count = 0
-        for email in selected_emails:
-            conn.execute("DELETE FROM users WHERE email = ?", (email,))
-            deleted_count += 1
-        conn.commit()
+        try:
+            deleted_count = submit_write_many("DELETE FROM users WHERE email = ?",
+                                              [(email,) for email in selected_emails]).result()
+        except sqlite3.OperationalError as e:
+            deleted_count = 0
+            st.error(f"Could not delete users: {str(e)}")
         if deleted_count > 0:
             st.success(f"Deleted {deleted_count} user(s)")
             st.rerun()
 
-    conn.close()
-
 
 # System Configuration Section
 st.header("⚙️ System Configuration")
@@ -1,44 +1,59 @@
 import streamlit as st
 import pandas as pd
-from utils.db import get_db_connection
+import sqlite3
+from utils.writer import submit_write
 from datetime import datetime
-from utils.ai_module import preprocess_solar_data, train_isolation_forest, detect_anomalies, generate_solar_summary
-
-
+from utils.baseline import generation_deviation
+from utils.alerts import ALERTS_PAGE_SIZE, ALERTS_POLL_SECONDS, alerts_version, get_alert_counts, get_alerts_page
+from utils.solar_store import ensure_fresh, get_recent_anomalies, is_rescoring
+
+
+@st.fragment
+def show_solar_anomaly_card(row, deviation):
+    """One solar anomaly; creating its ticket reruns only this card"""
+    with st.expander(f"Anomaly detected at {row['timestamp']}"):
+        st.metric("Generation", f"{row['generation_kw']:,.2f} kW",
+                  delta=None if deviation is None else f"{deviation:,.2f} kW vs expected")
+        st.write(f"**Time:** {row['timestamp']}")
+        st.write(f"**Hour of day:** {row['hour']}:00")
+        st.write(f"**Day of week:** {['Mon','Tue','Wed','Thu','Fri','Sat','Sun'][row['day_of_week']]}")
+
+        if st.button("Create Maintenance Ticket", key=f"solar_{row['timestamp']}"):
+            # Convert the timestamp to a string format
+            timestamp_str = row['timestamp'].strftime("%Y-%m-%d %H:%M:%S")
+            try:
+                submit_write("INSERT INTO solar_alerts (timestamp, generation_kw, deviation, detected) VALUES (?, ?, ?, ?)",
+                             (timestamp_str, row['generation_kw'], deviation,
+                              datetime.now().strftime("%Y-%m-%d %H:%M:%S"))).result()
+                st.success("Maintenance ticket created!")
+            except sqlite3.Error as e:
+                st.error(f"Could not create maintenance ticket: {str(e)}")
+
+
+@st.fragment
 def show_solar_alerts():
     st.subheader("Solar Generation Anomalies")
 
     # Load and process solar data
     try:
-        solar_data = pd.read_csv("utils/cleaned_solar_data_reduced.csv")
-        X_scaled, scaler, processed_data = preprocess_solar_data(solar_data)
-        model = train_isolation_forest(X_scaled)
-        results = detect_anomalies(model, X_scaled, processed_data)
+        ensure_fresh()
 
         # Get the 10 most recent anomalies
-        anomalies = results[results['is_anomaly'] == 1].sort_values('timestamp', ascending=False).head(10)
+        anomalies = get_recent_anomalies(10)
+
+        if anomalies.empty and is_rescoring():
+            st.info("Solar anomaly scores are being refreshed, check back shortly")
+            return
 
         if anomalies.empty:
             st.success("No recent solar generation anomalies detected")
             return
 
+        # Deviation from the seasonal baseline, looked up for every anomaly at once
+        anomalies['deviation'] = generation_deviation(anomalies['timestamp'], anomalies['generation_kw'])
         for _, row in anomalies.iterrows():
-            with st.expander(f"Anomaly detected at {row['timestamp']}"):
-                st.metric("Generation", f"{row['generation_kw']:,.2f} kW")
-                st.write(f"**Time:** {row['timestamp']}")
-                st.write(f"**Hour of day:** {row['hour']}:00")
-                st.write(f"**Day of week:** {['Mon','Tue','Wed','Thu','Fri','Sat','Sun'][row['day_of_week']]}")
-
-                if st.button("Create Maintenance Ticket", key=f"solar_{row['timestamp']}"):
-                    conn = get_db_connection()
-                    c = conn.cursor()
-                    # Convert the timestamp to a string format
-                    timestamp_str = row['timestamp'].strftime("%Y-%m-%d %H:%M:%S")
-                    c.execute("INSERT INTO solar_alerts (timestamp, generation_kw, detected) VALUES (?, ?, ?)",
-                              (timestamp_str, row['generation_kw'], datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-                    conn.commit()
-                    conn.close()
-                    st.success("Maintenance ticket created!")
+            deviation = None if pd.isna(row['deviation']) else float(row['deviation'])
+            show_solar_anomaly_card(row, deviation)
 
     except Exception as e:
         st.error(f"Error processing solar data: {str(e)}")
@@ -117,40 +132,92 @@ st.title("🚨 Alerts Overview")
 st.markdown("View and manage alert history across all systems.")
 st.divider()
 
-conn = get_db_connection()
-alerts = pd.read_sql("SELECT * FROM alerts", conn)
-conn.close()
-
-# Show alerts in sections
-severity_levels = ["High", "Medium", "Low"]
-for level in severity_levels:
-    st.subheader(f"{level}-Priority Alerts")
-
-    filtered = alerts[alerts['severity'] == level]
-    if filtered.empty:
-        st.info(f"No {level.lower()} priority alerts")
-        continue
-
-    for _, row in filtered.iterrows():
-        st.markdown(f"""
-        <div class="metric-card">
-            <p><strong>Asset:</strong> {row['asset_id']}</p>
-            <p><strong>Status:</strong> {row['severity']}</p>
-            <p><strong>Detected:</strong> {row['detected']}</p>
-            <p><strong>Metric:</strong> {row['metric']}</p>
-            <p><strong>Likely Cause:</strong> {row['likely_cause']}</p>
-            <p><strong>Suggested Action:</strong> {row['suggested_action']}</p>
-        </div>
-        """, unsafe_allow_html=True)
-
-        btn_cols = st.columns(2)
-        with btn_cols[0]:
-            if st.button("Assign Task", key=f"assign_{row['id']}"):
-                st.success(f"Task assigned for alert on asset {row['asset_id']}")
-        with btn_cols[1]:
-            if st.button("View Asset History", key=f"history_{row['id']}"):
-                st.session_state.show_asset_history = True
-                st.session_state.selected_asset = row['asset_id']
+# Keyset cursors per severity; the last entry is the current page
+if 'alert_cursors' not in st.session_state:
+    st.session_state.alert_cursors = {}
+
+
+def next_alert_page(level, cursor):
+    st.session_state.alert_cursors[level].append(cursor)
+
+
+def previous_alert_page(level):
+    st.session_state.alert_cursors[level].pop()
+
+
+@st.fragment
+def show_alert_card(row):
+    """One alert card; its buttons rerun only this card"""
+    st.markdown(f"""
+    <div class="metric-card">
+        <p><strong>Asset:</strong> {row['asset_id']}</p>
+        <p><strong>Status:</strong> {row['severity']}</p>
+        <p><strong>Detected:</strong> {row['detected']}</p>
+        <p><strong>Metric:</strong> {row['metric']}</p>
+        <p><strong>Likely Cause:</strong> {row['likely_cause']}</p>
+        <p><strong>Suggested Action:</strong> {row['suggested_action']}</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    btn_cols = st.columns(2)
+    with btn_cols[0]:
+        if st.button("Assign Task", key=f"assign_{row['id']}"):
+            st.success(f"Task assigned for alert on asset {row['asset_id']}")
+    with btn_cols[1]:
+        if st.button("View Asset History", key=f"history_{row['id']}"):
+            st.session_state.show_asset_history = True
+            st.session_state.selected_asset = row['asset_id']
+            # The history panel is outside this fragment
+            st.rerun()
+
+
+def show_alert_list():
+    """Alert sections, rerun on their own when live updates are on
+
+    Reads go through the query cache, which checks the alerts write counter
+    before querying, so a poll with no new alerts costs only a few
+    primary-key lookups.
+    """
+    version = alerts_version()
+    if st.session_state.get('alerts_seen_version') not in (None, version):
+        st.toast("Alerts updated")
+    st.session_state.alerts_seen_version = version
+
+    alert_counts = get_alert_counts()
+
+    # Show alerts in sections, one page at a time
+    severity_levels = ["High", "Medium", "Low"]
+    for level in severity_levels:
+        total = alert_counts.get(level, 0)
+        st.subheader(f"{level}-Priority Alerts ({total})")
+
+        if total == 0:
+            st.info(f"No {level.lower()} priority alerts")
+            continue
+
+        cursors = st.session_state.alert_cursors.setdefault(level, [None])
+        filtered, next_cursor = get_alerts_page(level, after=cursors[-1])
+
+        for _, row in filtered.iterrows():
+            show_alert_card(row)
+
+        if total > ALERTS_PAGE_SIZE:
+            page = len(cursors)
+            pages = -(-total // ALERTS_PAGE_SIZE)
+            nav_cols = st.columns([1, 2, 1])
+            with nav_cols[0]:
+                st.button("Previous", key=f"prev_{level}", disabled=page == 1,
+                          on_click=previous_alert_page, args=(level,))
+            with nav_cols[1]:
+                st.caption(f"Page {page} of {pages}")
+            with nav_cols[2]:
+                st.button("Next", key=f"next_{level}", disabled=next_cursor is None,
+                          on_click=next_alert_page, args=(level, next_cursor))
+
+
+live_updates = st.toggle("Live updates", key="alerts_live",
+                         help=f"Check for new alerts every {ALERTS_POLL_SECONDS} seconds")
+st.fragment(run_every=ALERTS_POLL_SECONDS if live_updates else None)(show_alert_list)()
 
 # Asset History Modal
 if st.session_state.get("show_asset_history", False):
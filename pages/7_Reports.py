@@ -1,31 +1,53 @@
 import streamlit as st
-from utils.db import get_db_connection
-import pandas as pd
-from utils.ai_module import preprocess_solar_data, train_isolation_forest, detect_anomalies
+from utils.db import cached_query
+from utils.ai_module import recalibrate_anomalies
+from utils.charts import downsample_series
+from utils.solar_store import (ensure_fresh, get_anomaly_counts, get_generation_series, get_solar_anomalies,
+                               get_solar_results, is_rescoring)
 
 
 def show_solar_analytics():
     st.subheader("Solar Generation Analytics")
 
     try:
-        solar_data = pd.read_csv("utils/cleaned_solar_data_reduced.csv")
-        X_scaled, scaler, processed_data = preprocess_solar_data(solar_data)
-        model = train_isolation_forest(X_scaled)
-        results = detect_anomalies(model, X_scaled, processed_data)
+        ensure_fresh()
+        anomaly_count = get_anomaly_counts()
+
+        if anomaly_count.sum() == 0 and is_rescoring():
+            st.info("Solar anomaly scores are being refreshed, check back shortly")
+            return
+
+        # Re-threshold the stored scores; changing sensitivity never retrains
+        col1, col2 = st.columns(2)
+        with col1:
+            threshold_scope = st.selectbox("Anomaly threshold", ["Model default", "Whole series", "Hour of day"])
+        with col2:
+            sensitivity = st.slider("Expected anomaly rate", 0.01, 0.20, 0.05, 0.01,
+                                    disabled=threshold_scope == "Model default")
+        # The model's own labels come from the rollups; only re-thresholding needs every raw score
+        if threshold_scope == "Model default":
+            anomalies = get_solar_anomalies()
+        else:
+            results = recalibrate_anomalies(get_solar_results(), sensitivity,
+                                            by='hour' if threshold_scope == "Hour of day" else None)
+            anomaly_count = results['is_anomaly'].value_counts()
+            anomalies = results[results['is_anomaly'] == 1]
 
         col1, col2 = st.columns(2)
 
         with col1:
             st.markdown("### Generation Overview")
-            st.line_chart(results.set_index('timestamp')['generation_kw'])
+            series, resolution = get_generation_series()
+            series = downsample_series(series, keep=series['anomalies'] > 0)
+            st.line_chart(series.set_index('timestamp')['generation_kw'])
+            if resolution != 'telemetry':
+                st.caption(f"{resolution.split('_')[1].capitalize()} averages")
 
         with col2:
             st.markdown("### Anomaly Distribution")
-            anomaly_count = results['is_anomaly'].value_counts()
             st.bar_chart(anomaly_count)
 
         with st.expander("Detailed Anomaly Report"):
-            anomalies = results[results['is_anomaly'] == 1]
             st.dataframe(anomalies[['timestamp', 'generation_kw', 'hour', 'day_of_week']])
 
             if st.button("Export Anomaly Report"):
@@ -142,13 +164,11 @@ with col3:
 
 # Detailed Reports
 st.header("Detailed Reports")
-conn = get_db_connection()
-
 show_solar_analytics()
 
 # Asset Status Report
 with st.expander("Asset Status Report", expanded=True):
-    assets = pd.read_sql("SELECT name, status, location, alerts FROM assets", conn)
+    assets = cached_query("SELECT name, status, location, alerts FROM assets", ['assets'])
     st.dataframe(
         assets,
         use_container_width=True,
@@ -157,11 +177,9 @@ with st.expander("Asset Status Report", expanded=True):
 
 # Maintenance History
 with st.expander("Maintenance History"):
-    work_orders = pd.read_sql("SELECT * FROM alerts", conn)
+    work_orders = cached_query("SELECT * FROM alerts", ['alerts'])
     st.dataframe(work_orders)
 
-conn.close()
-
 # Export Options
 st.divider()
 st.download_button(
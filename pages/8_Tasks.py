@@ -204,9 +204,9 @@ st.divider()
 if 'task_status' not in st.session_state:
     st.session_state.task_status = "Pending"
 
-# Top-level Buttons
-col1, col2, col3, col4 = st.columns(4)
-with col1:
+# Toolbar buttons that change nothing else on the page rerun on their own
+@st.fragment
+def show_work_order_download():
     if st.button("Print Work Order", use_container_width=True):
         try:
             pdf_buffer = generate_work_order_pdf()
@@ -219,90 +219,106 @@ with col1:
             st.success("Work order PDF generated successfully!")
         except Exception as e:
             st.error(f"Error generating PDF: {str(e)}")
-with col2:
-    st.file_uploader("Upload New", type=["pdf", "csv"], label_visibility="collapsed")
-with col3:
+
+
+@st.fragment
+def show_notify_technician():
     if st.button("Notify Technician", use_container_width=True):
         st.success("Technician notification sent!")
-with col4:
-    if st.button("Cancel Task", use_container_width=True):
-        st.session_state.task_status = "Cancelled"
-        st.warning("Task cancelled successfully! Status updated to 'Cancelled'")
-
-st.markdown("---")
-
-# Task Card
-st.subheader("Wind Turbine Inspection")
-st.markdown(f"""
-<div class="metric-card">
-    <p><strong>Status:</strong> <span style="color: {'red' if st.session_state.task_status == 'Cancelled' else 'orange' if st.session_state.task_status == 'In Progress' else 'green'}">{st.session_state.task_status}</span></p>
-    <p><strong>Priority:</strong> High (4/5)</p>
-    <p><strong>Due:</strong> 2025-06-20 14:30</p>
-    <p><strong>Notes:</strong> Check phase imbalance – similar to 2025-04 incident</p>
-    <p><strong>Attachments:</strong></p>
-    <ul>
-        <li>sensor_readings_023.csv</li>
-    </ul>
-</div>
-""", unsafe_allow_html=True)
-
-st.markdown("---")
-
-# Task Actions
-col1, col2, col3 = st.columns(3)
-with col1:
-    if st.button("Start Task", use_container_width=True, disabled=st.session_state.task_status == "Cancelled"):
-        st.session_state.task_status = "In Progress"
-        st.success("Task started! Status updated to 'In Progress'")
-with col2:
-    if st.button("Add Notes", use_container_width=True):
-        st.session_state.show_notes_form = True
-with col3:
-    if st.button("View Details", use_container_width=True):
-        st.session_state.show_task_details = True
-
-# Notes form
-if st.session_state.get("show_notes_form", False):
-    st.markdown("### Add Notes")
-    notes = st.text_area("Enter your notes:", height=100)
-    col1, col2 = st.columns(2)
+
+
+@st.fragment
+def show_task_panel():
+    """Task toolbar, card and actions; they share the task status so they rerun together"""
+    # Top-level Buttons
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        if st.button("Save Notes"):
-            st.success("Notes saved successfully!")
-            st.session_state.show_notes_form = False
+        show_work_order_download()
     with col2:
-        if st.button("Cancel"):
-            st.session_state.show_notes_form = False
-
-# Task details
-if st.session_state.get("show_task_details", False):
-    st.markdown("### Task Details")
-    st.markdown("""
-    **Task ID:** WT-2025-001  
-    **Created:** 2025-06-15 09:00  
-    **Assigned To:** John Smith  
-    **Location:** Wind Farm A, Turbine 23  
-    **Estimated Duration:** 2 hours  
-    **Required Tools:** Multimeter, Safety harness  
-    **Previous Issues:** Phase imbalance detected on 2025-04-15
-    """)
-    
-    # Notes History Section
-    st.markdown("### Notes History")
-    st.markdown("""
-    **2025-06-16 14:30 - John Smith:**  
-    Initial inspection completed. Bearing temperature reading 89°C, which is 14°C above normal. Vibration levels at 7.2mm/s. Recommend immediate lubrication and monitoring.
-    
-    **2025-06-16 15:45 - Sarah Johnson:**  
-    Applied high-temperature grease to bearing housing. Temperature dropped to 82°C within 30 minutes. Vibration reduced to 5.8mm/s. Will continue monitoring.
-    
-    **2025-06-17 09:15 - John Smith:**  
-    Follow-up inspection shows stable conditions. Temperature at 78°C, vibration at 5.2mm/s. Bearing appears to be responding well to lubrication. Scheduled for re-inspection in 48 hours.
-    
-    **2025-06-17 16:20 - Mike Wilson:**  
-    Completed final inspection. All parameters within normal range. Temperature: 75°C, Vibration: 4.8mm/s. Task completed successfully. No further action required.
-    """)
-    
-    if st.button("Close Details"):
-        st.session_state.show_task_details = False
+        st.file_uploader("Upload New", type=["pdf", "csv"], label_visibility="collapsed")
+    with col3:
+        show_notify_technician()
+    with col4:
+        if st.button("Cancel Task", use_container_width=True):
+            st.session_state.task_status = "Cancelled"
+            st.warning("Task cancelled successfully! Status updated to 'Cancelled'")
+
+    st.markdown("---")
+
+    # Task Card
+    st.subheader("Wind Turbine Inspection")
+    st.markdown(f"""
+    <div class="metric-card">
+        <p><strong>Status:</strong> <span style="color: {'red' if st.session_state.task_status == 'Cancelled' else 'orange' if st.session_state.task_status == 'In Progress' else 'green'}">{st.session_state.task_status}</span></p>
+        <p><strong>Priority:</strong> High (4/5)</p>
+        <p><strong>Due:</strong> 2025-06-20 14:30</p>
+        <p><strong>Notes:</strong> Check phase imbalance – similar to 2025-04 incident</p>
+        <p><strong>Attachments:</strong></p>
+        <ul>
+            <li>sensor_readings_023.csv</li>
+        </ul>
+    </div>
+    """, unsafe_allow_html=True)
+
+    st.markdown("---")
+
+    # Task Actions
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("Start Task", use_container_width=True, disabled=st.session_state.task_status == "Cancelled"):
+            st.session_state.task_status = "In Progress"
+            st.success("Task started! Status updated to 'In Progress'")
+    with col2:
+        if st.button("Add Notes", use_container_width=True):
+            st.session_state.show_notes_form = True
+    with col3:
+        if st.button("View Details", use_container_width=True):
+            st.session_state.show_task_details = True
+
+    # Notes form
+    if st.session_state.get("show_notes_form", False):
+        st.markdown("### Add Notes")
+        notes = st.text_area("Enter your notes:", height=100)
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Save Notes"):
+                st.success("Notes saved successfully!")
+                st.session_state.show_notes_form = False
+        with col2:
+            if st.button("Cancel"):
+                st.session_state.show_notes_form = False
+
+    # Task details
+    if st.session_state.get("show_task_details", False):
+        st.markdown("### Task Details")
+        st.markdown("""
+        **Task ID:** WT-2025-001  
+        **Created:** 2025-06-15 09:00  
+        **Assigned To:** John Smith  
+        **Location:** Wind Farm A, Turbine 23  
+        **Estimated Duration:** 2 hours  
+        **Required Tools:** Multimeter, Safety harness  
+        **Previous Issues:** Phase imbalance detected on 2025-04-15
+        """)
+
+        # Notes History Section
+        st.markdown("### Notes History")
+        st.markdown("""
+        **2025-06-16 14:30 - John Smith:**  
+        Initial inspection completed. Bearing temperature reading 89°C, which is 14°C above normal. Vibration levels at 7.2mm/s. Recommend immediate lubrication and monitoring.
+
+        **2025-06-16 15:45 - Sarah Johnson:**  
+        Applied high-temperature grease to bearing housing. Temperature dropped to 82°C within 30 minutes. Vibration reduced to 5.8mm/s. Will continue monitoring.
+
+        **2025-06-17 09:15 - John Smith:**  
+        Follow-up inspection shows stable conditions. Temperature at 78°C, vibration at 5.2mm/s. Bearing appears to be responding well to lubrication. Scheduled for re-inspection in 48 hours.
+
+        **2025-06-17 16:20 - Mike Wilson:**  
+        Completed final inspection. All parameters within normal range. Temperature: 75°C, Vibration: 4.8mm/s. Task completed successfully. No further action required.
+        """)
+
+        if st.button("Close Details"):
+            st.session_state.show_task_details = False
+
 
+show_task_panel()
@@ -1,6 +1,8 @@
 import streamlit as st
 from utils.db import get_db_connection, hash_password
+from utils.writer import submit_write
 import pandas as pd
+import sqlite3
 
 
 def get_dashboard_file(role):
@@ -124,12 +126,14 @@ with st.container():
 
             if hash_password(current_pass) == user['password']:
                 if new_pass == confirm_pass:
-                    conn.execute(
-                        "UPDATE users SET password = ? WHERE email = ?",
-                        (hash_password(new_pass), st.session_state.current_user)
-                    )
-                    conn.commit()
-                    st.success("Password updated successfully")
+                    try:
+                        submit_write(
+                            "UPDATE users SET password = ? WHERE email = ?",
+                            (hash_password(new_pass), st.session_state.current_user)
+                        ).result()
+                        st.success("Password updated successfully")
+                    except sqlite3.OperationalError as e:
+                        st.error(f"Could not update password: {str(e)}")
                 else:
                     st.error("New passwords don't match")
             else:
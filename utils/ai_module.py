@@ -1,50 +1,230 @@
+import hashlib
+import os
+
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 from datetime import datetime
 
+from utils import solar_parquet
 
-def preprocess_solar_data(df):
-    """Preprocess solar generation data"""
-    # Convert timestamp and extract features
+SOLAR_DATA_PATH = "utils/cleaned_solar_data_reduced.csv"
+SOLAR_FEATURES = ['generation_kw', 'hour', 'day_of_week']
+CHUNK_SIZE = 100_000
+TRAINING_SAMPLE_SIZE = 100_000
+
+_fingerprints = {}
+
+
+def dataset_fingerprint(path=SOLAR_DATA_PATH):
+    """Content hash of a data file, memoized on its size and mtime"""
+    stat = os.stat(path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+
+    cached = _fingerprints.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    fingerprint = digest.hexdigest()[:16]
+
+    _fingerprints[path] = (stamp, fingerprint)
+    return fingerprint
+
+
+def parquet_cache_is_current(path=SOLAR_DATA_PATH):
+    return solar_parquet.cache_fingerprint() == dataset_fingerprint(path)
+
+
+def convert_solar_to_parquet(path=SOLAR_DATA_PATH, chunksize=CHUNK_SIZE):
+    """Rebuild the day-partitioned Parquet cache from the source CSV"""
+    solar_parquet.build_parquet_cache(pd.read_csv(path, chunksize=chunksize), dataset_fingerprint(path))
+
+
+def iter_solar_chunks(path=SOLAR_DATA_PATH, chunksize=CHUNK_SIZE, start=None):
+    """Read solar data in chunks so memory is bounded by chunk size
+
+    Uses the Parquet cache when it is current, pushing the ``start`` bound
+    down to the day partitions; otherwise streams the CSV, in which case
+    ``start`` is left for the caller to apply.
+    """
+    if parquet_cache_is_current(path):
+        yield from solar_parquet.iter_solar_batches(start=start, batch_size=chunksize)
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def load_solar_data(start=None, end=None, columns=None, path=SOLAR_DATA_PATH):
+    """Load solar readings in (start, end) with only the requested columns"""
+    if parquet_cache_is_current(path):
+        return solar_parquet.read_solar_range(start, end, columns)
+
+    df = pd.read_csv(path, usecols=None if columns is None else sorted({'timestamp', *columns}))
+    timestamps = pd.to_datetime(df['timestamp'], utc=True)
+    if start is not None:
+        df = df[timestamps > solar_parquet.to_utc(start)]
+    if end is not None:
+        df = df[timestamps < solar_parquet.to_utc(end)]
+    return df if columns is None else df[columns]
+
+
+def add_solar_features(df, compact=False):
+    """Parse timestamps and add the calendar features
+
+    With ``compact=True`` the calendar columns are int8 instead of int64.
+    """
     df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['hour'] = df['timestamp'].dt.hour
-    df['day_of_week'] = df['timestamp'].dt.dayofweek
-    df['is_daylight'] = df['hour'].between(6, 18).astype(int)
+    int_type = np.int8 if compact else int
+    df['hour'] = df['timestamp'].dt.hour.astype(int_type)
+    df['day_of_week'] = df['timestamp'].dt.dayofweek.astype(int_type)
+    df['is_daylight'] = df['hour'].between(6, 18).astype(int_type)
+    return df
+
+
+def preprocess_solar_data(df, scaler=None, compact=False):
+    """Preprocess solar generation data
+
+    Pass a fitted ``scaler`` to reuse it; otherwise a new one is fitted.
+    With ``compact=True`` the calendar columns are int8 and the features are
+    built as one float32 matrix that is scaled in place, instead of float64
+    copies. Isolation forests split on float32 anyway, so labels are unchanged.
+    """
+    # Convert timestamp and extract features
+    df = add_solar_features(df, compact)
 
     # Scale the numerical features
-    scaler = StandardScaler()
-    features = ['generation_kw', 'hour', 'day_of_week']
-    X_scaled = scaler.fit_transform(df[features])
+    if compact:
+        X_scaled = df[SOLAR_FEATURES].to_numpy(np.float32)
+        if scaler is None:
+            scaler = StandardScaler().fit(X_scaled)
+        X_scaled -= scaler.mean_.astype(np.float32)
+        X_scaled /= scaler.scale_.astype(np.float32)
+    elif scaler is None:
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(df[SOLAR_FEATURES])
+    else:
+        X_scaled = scaler.transform(df[SOLAR_FEATURES])
 
     return X_scaled, scaler, df
 
 
-def train_isolation_forest(X_scaled, contamination=0.05):
+def memory_footprint(X_scaled, df):
+    """Bytes held by a preprocessed feature matrix and frame"""
+    frame_bytes = int(df.memory_usage(deep=True).sum())
+    return {'features': X_scaled.nbytes, 'frame': frame_bytes, 'total': X_scaled.nbytes + frame_bytes}
+
+
+def train_isolation_forest(X_scaled, contamination=0.05, n_estimators=100, n_jobs=None):
     """Train an isolation forest model"""
     model = IsolationForest(contamination=contamination,
                             random_state=42,
-                            n_estimators=100)
+                            n_estimators=n_estimators,
+                            n_jobs=n_jobs)
     model.fit(X_scaled)
     return model
 
 
+def train_from_chunks(chunks, contamination=0.05, n_estimators=100,
+                      sample_size=TRAINING_SAMPLE_SIZE, seed=42):
+    """Fit a scaler and isolation forest from a stream of raw chunks
+
+    The scaler sees every row through ``partial_fit``; the forest is fitted
+    on a uniform sample of at most ``sample_size`` rows (bottom-k sampling),
+    so memory stays bounded by chunk size plus sample size. When the data
+    fits in the sample this matches fitting on the full frame.
+    """
+    rng = np.random.default_rng(seed)
+    scaler = StandardScaler()
+    sample = None
+    offset = 0
+
+    for chunk in chunks:
+        chunk = add_solar_features(chunk, compact=True)[SOLAR_FEATURES]
+        chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        offset += len(chunk)
+        scaler.partial_fit(chunk)
+
+        chunk = chunk.assign(_key=rng.random(len(chunk)))
+        sample = chunk if sample is None else pd.concat([sample, chunk])
+        if len(sample) > sample_size:
+            sample = sample.nsmallest(sample_size, '_key')
+
+    if sample is None:
+        raise ValueError("No solar data to train on")
+
+    X_scaled = scaler.transform(sample.sort_index()[SOLAR_FEATURES])
+    return scaler, train_isolation_forest(X_scaled, contamination, n_estimators)
+
+
 def detect_anomalies(model, X_scaled, df):
     """Detect anomalies and return labeled data"""
     preds = model.predict(X_scaled)
     df['is_anomaly'] = (preds == -1).astype(int)
+    # Negative scores are anomalous; lower means more abnormal
+    df['anomaly_score'] = model.decision_function(X_scaled)
     return df
 
 
-def generate_solar_summary(df):
-    """Generate summary of solar anomalies"""
-    anomalies = df[df['is_anomaly'] == 1]
+def recalibrate_anomalies(df, contamination=0.05, by=None):
+    """Relabel ``is_anomaly`` from stored ``anomaly_score`` values without refitting
+
+    The threshold is the ``contamination`` quantile of the scores, taken
+    over the whole frame or within each group of the ``by`` column (e.g.
+    ``'hour'`` or ``'asset_id'``). Scores strictly below it are anomalous,
+    so groups of identical scores such as night-time zeros are not flagged.
+    """
+    scores = df['anomaly_score']
+    if by is None:
+        threshold = scores.quantile(contamination)
+    else:
+        threshold = scores.groupby(df[by]).transform('quantile', contamination)
+    return df.assign(is_anomaly=(scores < threshold).astype(int))
+
 
+def summarize_solar_anomalies(df, top_n=10):
+    """Summarize solar anomalies without per-row Python loops
+
+    Returns a dict with the anomalous ``rows``, contiguous ``runs`` of
+    anomalous readings, ``daily_counts``, the ``worst`` deviations from the
+    median generation at the same hour of day, and the plain ``text``.
+    """
+    anomalies = df[df['is_anomaly'] == 1]
     if anomalies.empty:
-        return "No solar generation anomalies detected"
+        return {'rows': anomalies, 'runs': pd.DataFrame(), 'daily_counts': pd.Series(dtype=int),
+                'worst': anomalies, 'text': "No solar generation anomalies detected"}
+
+    lines = ("- " + anomalies['timestamp'].map(str)
+             + ": Generation " + anomalies['generation_kw'].map('{:.2f}'.format) + " kW\n")
+    text = f"Detected {len(anomalies)} solar generation anomalies:\n" + "".join(lines)
 
-    summary = f"Detected {len(anomalies)} solar generation anomalies:\n"
-    for _, row in anomalies.iterrows():
-        summary += f"- {row['timestamp']}: Generation {row['generation_kw']:.2f} kW\n"
+    ordered = df.sort_values('timestamp')
+    timestamps = pd.to_datetime(ordered['timestamp'])
+    expected = ordered['generation_kw'].groupby(timestamps.dt.hour).transform('median')
+    deviation = (ordered['generation_kw'] - expected).rename('deviation_kw')
 
-    return summary
\ No newline at end of file
+    # A run starts wherever an anomaly follows a normal reading
+    flags = ordered['is_anomaly'].to_numpy() == 1
+    starts = flags & ~np.concatenate(([False], flags[:-1]))
+    run_ids = np.cumsum(starts)[flags]
+
+    flagged = ordered[flags].assign(deviation_kw=deviation[flags], timestamp=timestamps[flags])
+    flagged['abs_deviation_kw'] = flagged['deviation_kw'].abs()
+    runs = flagged.groupby(run_ids).agg(start=('timestamp', 'min'),
+                                        end=('timestamp', 'max'),
+                                        readings=('timestamp', 'size'),
+                                        min_generation_kw=('generation_kw', 'min'),
+                                        max_abs_deviation_kw=('abs_deviation_kw', 'max'))
+    daily_counts = flagged.groupby(flagged['timestamp'].dt.date).size().rename('anomalies')
+    worst = flagged.nlargest(top_n, 'abs_deviation_kw').drop(columns='abs_deviation_kw')
+
+    return {'rows': anomalies, 'runs': runs.reset_index(drop=True), 'daily_counts': daily_counts,
+            'worst': worst, 'text': text}
+
+
+def generate_solar_summary(df):
+    """Generate summary of solar anomalies"""
+    return summarize_solar_anomalies(df)['text']
@@ -0,0 +1,44 @@
+from utils.db import cached_query, get_db_connection, table_versions
+
+ALERTS_PAGE_SIZE = 20
+# Seconds between change checks when the Alerts page is in live mode
+ALERTS_POLL_SECONDS = 10
+
+
+def alerts_version():
+    """Write counter of the alerts table; it changes whenever an alert is added, edited or removed"""
+    conn = get_db_connection()
+    version = table_versions(conn, ['alerts'])[0]
+    conn.close()
+    return version
+
+
+def get_alert_counts():
+    """Number of alerts per severity"""
+    counts = cached_query("SELECT severity, COUNT(*) AS alerts FROM alerts GROUP BY severity", ['alerts'])
+    return dict(zip(counts['severity'], counts['alerts'].tolist()))
+
+
+def get_alerts_page(severity, after=None, limit=ALERTS_PAGE_SIZE):
+    """One page of alerts for a severity, newest first
+
+    ``after`` is the (detected, id) key of the last row of the previous
+    page. Pages are read straight off the alerts(severity, detected) index,
+    so the cost does not grow with alert history. Returns the page and the
+    key to pass for the next one, or None when this is the last page.
+    """
+    query = "SELECT * FROM alerts WHERE severity = ?"
+    params = [severity]
+    if after is not None:
+        query += " AND (detected, id) < (?, ?)"
+        params.extend(after)
+    query += " ORDER BY detected DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    page = cached_query(query, ['alerts'], params)
+
+    if len(page) <= limit:
+        return page, None
+    page = page.iloc[:limit]
+    last = page.iloc[-1]
+    return page, (last['detected'], int(last['id']))
@@ -0,0 +1,69 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from utils.ai_module import SOLAR_FEATURES, add_solar_features, train_isolation_forest
+from utils.db import get_db_connection
+from utils.model_registry import model_key, register_model
+
+
+def asset_model_key(asset_id, contamination=0.05, n_estimators=100):
+    return model_key(f"asset{asset_id}", contamination, n_estimators)
+
+
+def _fit_asset(asset_id, features, contamination, n_estimators):
+    """Worker: fit one asset's scaler and forest on its own feature matrix"""
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(features)
+    model = train_isolation_forest(X_scaled, contamination, n_estimators, n_jobs=1)
+    return asset_id, scaler, model
+
+
+def train_asset_models(telemetry, by='asset_id', contamination=0.05, n_estimators=100, max_workers=None):
+    """Fit one anomaly model per asset (or asset type) across a process pool
+
+    ``telemetry`` needs ``timestamp``, ``generation_kw`` and the ``by``
+    column. Rows are grouped once in the parent and each worker is sent
+    only its own float32 feature slice, never the full frame. Workers fit
+    single-threaded so the pool, not the forests, uses the cores. Returns
+    a mapping of asset to registry key.
+    """
+    telemetry = add_solar_features(telemetry.copy(), compact=True)
+    features = telemetry[SOLAR_FEATURES].to_numpy(np.float32)
+    groups = telemetry.groupby(by).indices
+
+    # spawn rather than fork: the parent may be a threaded Streamlit server
+    context = multiprocessing.get_context('spawn')
+    workers = min(max_workers or os.cpu_count() or 1, len(groups)) or 1
+
+    keys = {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(_fit_asset, asset_id, features[rows], contamination, n_estimators)
+                   for asset_id, rows in groups.items()]
+        for future in as_completed(futures):
+            asset_id, scaler, model = future.result()
+            key = asset_model_key(asset_id, contamination, n_estimators)
+            register_model(key, scaler, model)
+            keys[asset_id] = key
+    return keys
+
+
+def load_fleet_telemetry():
+    """Stored telemetry for every asset that has any, in (asset, time) order"""
+    conn = get_db_connection()
+    telemetry = pd.read_sql("""
+        SELECT t.asset_id, a.type AS asset_type, t.ts, t.generation_kw
+        FROM telemetry t JOIN assets a ON a.id = t.asset_id
+        ORDER BY t.asset_id, t.ts
+    """, conn)
+    conn.close()
+    telemetry.insert(2, 'timestamp', pd.to_datetime(telemetry.pop('ts'), unit='s'))
+    return telemetry
+
+
+if __name__ == "__main__":
+    print(train_asset_models(load_fleet_telemetry()))
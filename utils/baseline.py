@@ -0,0 +1,76 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.db import get_db_connection
+
+# Days either side of a day of year pooled into its expected value
+SMOOTHING_DAYS = 7
+
+_cache = {'version': None, 'expected': None}
+_cache_lock = threading.Lock()
+
+
+def _keys(timestamps):
+    timestamps = pd.DatetimeIndex(pd.to_datetime(timestamps, utc=True))
+    return timestamps.dayofyear.to_numpy(), timestamps.hour.to_numpy()
+
+
+def _baseline_version(conn):
+    row = conn.execute("SELECT value FROM solar_meta WHERE key = 'baseline_version'").fetchone()
+    return int(row[0]) if row else 0
+
+
+def _expected_table(conn):
+    """Expected generation as a 367 x 24 array indexed by [day_of_year, hour]
+
+    Each cell pools the sums of the surrounding SMOOTHING_DAYS days (wrapping
+    around the year end) so days without history still get a value; cells
+    with no readings anywhere in the window are NaN.
+    """
+    totals = np.zeros((367, 24))
+    counts = np.zeros((367, 24))
+    cells = np.array(conn.execute("SELECT day_of_year, hour, readings, total_kw FROM solar_baseline").fetchall())
+    if len(cells):
+        days, hours = cells[:, 0].astype(int), cells[:, 1].astype(int)
+        counts[days, hours] = cells[:, 2]
+        totals[days, hours] = cells[:, 3]
+
+    # Circular moving sum over days 1..366 via cumulative sums
+    width = 2 * SMOOTHING_DAYS + 1
+    padded_totals = np.concatenate([totals[-SMOOTHING_DAYS:], totals[1:], totals[1:SMOOTHING_DAYS + 1]])
+    padded_counts = np.concatenate([counts[-SMOOTHING_DAYS:], counts[1:], counts[1:SMOOTHING_DAYS + 1]])
+    window_totals = np.cumsum(np.vstack([np.zeros((1, 24)), padded_totals]), axis=0)
+    window_counts = np.cumsum(np.vstack([np.zeros((1, 24)), padded_counts]), axis=0)
+    summed_totals = window_totals[width:] - window_totals[:-width]
+    summed_counts = window_counts[width:] - window_counts[:-width]
+
+    expected = np.full((367, 24), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected[1:] = np.where(summed_counts > 0, summed_totals / summed_counts, np.nan)
+    return expected
+
+
+def expected_table():
+    """Cached expected-generation lookup, reloaded only after the baseline changes"""
+    conn = get_db_connection()
+    version = _baseline_version(conn)
+    with _cache_lock:
+        if _cache['version'] != version:
+            _cache['expected'] = _expected_table(conn)
+            _cache['version'] = version
+        expected = _cache['expected']
+    conn.close()
+    return expected
+
+
+def expected_generation(timestamps):
+    """Expected generation for each timestamp, as one vectorized lookup"""
+    day_of_year, hour = _keys(timestamps)
+    return expected_table()[day_of_year, hour]
+
+
+def generation_deviation(timestamps, generation_kw):
+    """Observed minus expected generation; NaN where there is no baseline yet"""
+    return np.asarray(generation_kw, dtype=np.float64) - expected_generation(timestamps)
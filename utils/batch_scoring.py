@@ -0,0 +1,163 @@
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from utils.ai_module import preprocess_solar_data
+from utils.db import get_db_connection
+from utils.feature_cache import feature_cache_dir, load_feature_cache
+from utils.model_registry import load_model, model_path
+from utils.telemetry import solar_asset_id
+
+SHARD_ROWS = 250_000
+UPDATE_BATCH_SIZE = 5000
+
+# Per-worker state set up once by _init_worker
+_worker = {}
+
+
+def _attach(name, shape, dtype):
+    # Spawned workers share the parent's resource tracker, which unlinks the segment
+    shm = SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _init_worker(model_file, n_rows, features_file, score_name, flag_name):
+    _worker['model'] = joblib.load(model_file)[1]
+    _worker['segments'] = []
+    _worker['X'] = np.load(features_file, mmap_mode='r')[:n_rows]
+    for key, name, dtype in [('score', score_name, np.float64), ('flag', flag_name, np.int8)]:
+        shm, array = _attach(name, (n_rows,), dtype)
+        _worker['segments'].append(shm)
+        _worker[key] = array
+
+
+def _score_shard(start, stop):
+    """Worker: score rows [start, stop) in place in the shared output arrays"""
+    scores = _worker['model'].decision_function(_worker['X'][start:stop])
+    _worker['score'][start:stop] = scores
+    _worker['flag'][start:stop] = scores < 0
+    return stop - start
+
+
+def _run_shards(key, n_rows, features_file, outputs, n_workers, shard_rows):
+    scores = np.ndarray((n_rows,), dtype=np.float64, buffer=outputs[0].buf)
+    flags = np.ndarray((n_rows,), dtype=np.int8, buffer=outputs[1].buf)
+
+    shards = [(start, min(start + shard_rows, n_rows)) for start in range(0, n_rows, shard_rows)]
+    workers = min(n_workers or os.cpu_count() or 1, len(shards)) or 1
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker,
+                             initargs=(model_path(key), n_rows, features_file,
+                                       outputs[0].name, outputs[1].name)) as pool:
+        list(pool.map(_score_shard, *zip(*shards)))
+
+    # Copy out so no views into the segments outlive them
+    return flags.astype(int), scores.copy()
+
+
+def score_feature_file(key, features_file, n_rows, n_workers=None, shard_rows=SHARD_ROWS):
+    """Score the first ``n_rows`` of a float32 .npy feature file across worker processes
+
+    Workers memory-map the file, so nothing is copied and every worker
+    shares its pages. Scores and flags are written into shared output
+    arrays by row position, so results come back in input order with no
+    per-shard copies. Returns ``(is_anomaly, anomaly_score)`` arrays.
+    """
+    if n_rows == 0:
+        return np.empty(0, dtype=int), np.empty(0)
+
+    outputs = [SharedMemory(create=True, size=n_rows * itemsize) for itemsize in (8, 1)]
+    try:
+        return _run_shards(key, n_rows, features_file, outputs, n_workers, shard_rows)
+    finally:
+        for shm in outputs:
+            shm.close()
+            shm.unlink()
+
+
+def _score_late_rows(conn, asset_id, pair, after):
+    """Score readings stored after the feature cache was built, in the caller's transaction"""
+    late = pd.read_sql("SELECT ts, generation_kw FROM telemetry "
+                       "WHERE asset_id = ? AND ts > COALESCE(?, -9223372036854775808) ORDER BY ts",
+                       conn, params=(asset_id, after))
+    if late.empty:
+        return 0
+
+    timestamps = late['ts'].tolist()
+    late.insert(0, 'timestamp', pd.to_datetime(late.pop('ts'), unit='s', utc=True))
+    scores = pair[1].decision_function(preprocess_solar_data(late, scaler=pair[0], compact=True)[0])
+    conn.executemany("UPDATE telemetry SET is_anomaly = ?, anomaly_score = ? WHERE asset_id = ? AND ts = ?",
+                     zip((scores < 0).astype(int).tolist(), scores.tolist(), [asset_id] * len(timestamps),
+                         timestamps))
+    return len(timestamps)
+
+
+def backfill_solar_data(key, n_workers=None, shard_rows=SHARD_ROWS, atomic=False):
+    """Rescore every stored solar reading with the registered model ``key``
+
+    Features come from the memory-mapped feature cache of the stored
+    series and the model's scaler (built on first use), are scored in
+    parallel and written back by primary key in batched transactions.
+    Readings ingested since the cache was built are scored in the final
+    transaction, which also makes the model the one incremental ingestion
+    continues with. With ``atomic=True`` the batches go to
+    telemetry_staged_scores instead and are swapped into telemetry in that
+    same transaction with one set-based UPDATE. WAL readers then see
+    either the old scores or the new ones, never a mix, and other writers
+    are only blocked for the swap.
+    """
+    pair = load_model(key)
+    if pair is None:
+        raise ValueError(f"No registered model {key}")
+
+    conn = get_db_connection()
+    asset_id = solar_asset_id(conn)
+    cache_dir = feature_cache_dir(pair[0], asset_id)
+    _, timestamps = load_feature_cache(cache_dir)
+    flags, scores = score_feature_file(key, os.path.join(cache_dir, 'features.npy'), len(timestamps),
+                                       n_workers, shard_rows)
+
+    if atomic:
+        with conn:
+            conn.execute("DELETE FROM telemetry_staged_scores WHERE asset_id = ?", (asset_id,))
+    for start in range(0, len(timestamps), UPDATE_BATCH_SIZE):
+        stop = start + UPDATE_BATCH_SIZE
+        batch_ts = (np.asarray(timestamps[start:stop]) // 1_000_000_000).tolist()
+        rows = zip(flags[start:stop].tolist(), scores[start:stop].tolist(), [asset_id] * len(batch_ts), batch_ts)
+        if atomic:
+            conn.executemany("INSERT OR REPLACE INTO telemetry_staged_scores (is_anomaly, anomaly_score, asset_id, ts) "
+                             "VALUES (?, ?, ?, ?)", rows)
+        else:
+            conn.executemany("UPDATE telemetry SET is_anomaly = ?, anomaly_score = ? WHERE asset_id = ? AND ts = ?",
+                             rows)
+        conn.commit()
+
+    # The write lock is taken first so no reading can land between scoring the late rows and the switch
+    last_ts = int(timestamps[-1]) // 1_000_000_000 if len(timestamps) else None
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if atomic:
+            conn.execute("""
+                UPDATE telemetry SET is_anomaly = s.is_anomaly, anomaly_score = s.anomaly_score
+                FROM telemetry_staged_scores s
+                WHERE telemetry.asset_id = s.asset_id AND telemetry.ts = s.ts
+            """)
+            conn.execute("DELETE FROM telemetry_staged_scores WHERE asset_id = ?", (asset_id,))
+        late = _score_late_rows(conn, asset_id, pair, last_ts)
+        conn.execute("INSERT OR REPLACE INTO solar_meta (key, value) VALUES ('model_key', ?)", (key,))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    conn.close()
+    return len(timestamps) + late
+
+
+if __name__ == "__main__":
+    print(f"Rescored {backfill_solar_data(sys.argv[1])} rows")
@@ -0,0 +1,52 @@
+import numpy as np
+
+# Points sent to the browser per chart line, roughly one per horizontal pixel
+CHART_POINTS = 1000
+
+
+def lttb(x, y, n_out):
+    """Indices of ``n_out`` points chosen by Largest-Triangle-Three-Buckets
+
+    The first and last points are always kept; every bucket in between
+    keeps the point forming the largest triangle with the previous pick and
+    the next bucket's mean, which preserves peaks and troughs.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    previous = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        next_x, next_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[previous] - next_x) * (y[lo:hi] - y[previous])
+                      - (x[previous] - x[lo:hi]) * (next_y - y[previous]))
+        previous = lo + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample_series(df, x='timestamp', y='generation_kw', keep=None, max_points=CHART_POINTS):
+    """Rows of ``df`` reduced to about ``max_points`` with LTTB, plus every ``keep`` row
+
+    ``keep`` is a boolean mask of rows that must survive, such as
+    anomalies; they are added on top of the LTTB selection so they are
+    never averaged away. ``df`` must be sorted by ``x``.
+    """
+    if len(df) <= max_points:
+        return df
+
+    x_values = df[x].to_numpy()
+    if np.issubdtype(x_values.dtype, np.datetime64):
+        x_values = x_values.astype('datetime64[s]').astype(np.int64)
+    rows = lttb(x_values, df[y].to_numpy(), max_points)
+    if keep is not None:
+        rows = np.union1d(rows, np.flatnonzero(np.asarray(keep)))
+    return df.iloc[rows]
@@ -1,20 +1,143 @@
 import sqlite3
 import hashlib
+import threading
+from collections import OrderedDict
 
+import pandas as pd
 
-def get_db_connection():
-    return sqlite3.connect('rayfield.db')
+DB_PATH = 'rayfield.db'
+
+# Applied to every pooled connection. WAL lets dashboard readers keep going
+# while ingestion or VACUUM writes; NORMAL sync is durable in WAL mode
+# except for the last transactions on power loss.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
+MAX_IDLE_CONNECTIONS = 8
+
+# Tables whose writes bump a version counter, so cached reads of them can be
+# invalidated exactly; see cached_query
+VERSIONED_TABLES = ('users', 'assets', 'alerts', 'solar_alerts', 'model_jobs')
+QUERY_CACHE_SIZE = 128
+
+
+SOLAR_DATA_SCHEMA = '''CREATE TABLE IF NOT EXISTS solar_data
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  timestamp TEXT,
+                  generation_kw REAL,
+                  hour INTEGER,
+                  day_of_week INTEGER,
+                  is_daylight INTEGER,
+                  is_anomaly INTEGER DEFAULT 0,
+                  anomaly_score REAL)'''
+
+# Readings for every asset, clustered by (asset_id, ts) so one asset's time
+# window is a single contiguous b-tree range. ts is UTC epoch seconds.
+TELEMETRY_SCHEMA = '''CREATE TABLE IF NOT EXISTS telemetry
+                 (asset_id INTEGER NOT NULL,
+                  ts INTEGER NOT NULL,
+                  generation_kw REAL,
+                  is_anomaly INTEGER NOT NULL DEFAULT 0,
+                  anomaly_score REAL,
+                  PRIMARY KEY (asset_id, ts)) WITHOUT ROWID'''
+
+# Rollup tables over telemetry and their bucket width in seconds
+TELEMETRY_ROLLUPS = (('telemetry_hourly', 3600), ('telemetry_daily', 86400))
+
+
+class PooledConnection(sqlite3.Connection):
+    """Connection whose close() leaves it open for the pool
+
+    Other code on the same thread may still be using it, so uncommitted
+    work is only rolled back once the owning thread has finished.
+    """
+
+    def close(self):
+        pass
+
+    def close_for_real(self):
+        super().close()
+
+
+class ConnectionPool:
+    """One connection per thread, recycled once the thread has finished
+
+    Streamlit runs each script rerun on its own thread, so connections are
+    leased to a thread and handed to the next thread when the owner exits.
+    """
+
+    def __init__(self, path, max_idle=MAX_IDLE_CONNECTIONS):
+        self.path = path
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = []
+        self._leased = {}
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, factory=PooledConnection)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _reap(self):
+        for thread in [t for t in self._leased if not t.is_alive()]:
+            conn = self._leased.pop(thread)
+            if conn.in_transaction:
+                conn.rollback()
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+            else:
+                conn.close_for_real()
+
+    def connection(self):
+        thread = threading.current_thread()
+        with self._lock:
+            conn = self._leased.get(thread)
+            if conn is not None:
+                return conn
+            self._reap()
+            conn = self._idle.pop() if self._idle else None
+
+        if conn is None:
+            conn = self._connect()
+        with self._lock:
+            self._leased[thread] = conn
+        return conn
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._idle + list(self._leased.values()):
+                conn.close_for_real()
+            self._idle.clear()
+            self._leased.clear()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=DB_PATH):
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+
+def get_db_connection(path=DB_PATH):
+    """Pooled connection for the calling thread; close() hands it back"""
+    return get_pool(path).connection()
 
 
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
 
-def init_db():
-    conn = sqlite3.connect('rayfield.db')
-    c = conn.cursor()
-
-    # Create tables
+def _create_base_tables(c):
     c.execute('''CREATE TABLE IF NOT EXISTS users
                  (id INTEGER PRIMARY KEY AUTOINCREMENT,
                   email TEXT UNIQUE,
@@ -39,7 +162,52 @@ def init_db():
                   suggested_action TEXT,
                   FOREIGN KEY(asset_id) REFERENCES assets(id))''')
 
-    # Insert sample data if empty
+    c.execute(SOLAR_DATA_SCHEMA)
+
+    c.execute('''CREATE TABLE IF NOT EXISTS solar_meta
+                 (key TEXT PRIMARY KEY,
+                  value TEXT)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS solar_alerts
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  timestamp TEXT,
+                  generation_kw REAL,
+                  deviation REAL,
+                  detected TEXT)''')
+
+
+def _upgrade_solar_data(c):
+    """Bring solar_data written by older code up to SOLAR_DATA_SCHEMA
+
+    Tables written by the old to_sql(if_exists='replace') path have no id
+    primary key; their rows are derived data, so they are dropped and
+    re-ingested rather than copied.
+    """
+    columns = {row[1] for row in c.execute("PRAGMA table_info(solar_data)")}
+    if 'id' not in columns:
+        c.execute("DROP TABLE solar_data")
+        c.execute(SOLAR_DATA_SCHEMA)
+        c.execute("DELETE FROM solar_meta")
+        columns = {row[1] for row in c.execute("PRAGMA table_info(solar_data)")}
+
+    for column, sql_type in [('hour', 'INTEGER'), ('day_of_week', 'INTEGER'),
+                             ('is_daylight', 'INTEGER'), ('anomaly_score', 'REAL')]:
+        if column not in columns:
+            c.execute(f"ALTER TABLE solar_data ADD COLUMN {column} {sql_type}")
+
+    # Timestamps are unique so a retried ingestion chunk is ignored instead of duplicated
+    c.execute("DROP INDEX IF EXISTS idx_solar_data_timestamp")
+    c.execute("CREATE UNIQUE INDEX idx_solar_data_timestamp ON solar_data (timestamp)")
+
+
+def _add_lookup_indexes(c):
+    c.execute("CREATE INDEX IF NOT EXISTS idx_alerts_severity_detected ON alerts (severity, detected)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_alerts_asset_id ON alerts (asset_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_solar_alerts_timestamp ON solar_alerts (timestamp)")
+
+
+def _seed_sample_data(c):
+    """Insert sample data into empty tables"""
     if c.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0:
         sample_users = [
             ('admin@rayfield.com', hash_password('admin123'), 'Admin'),
@@ -70,18 +238,253 @@ def init_db():
             "INSERT INTO alerts (asset_id, severity, detected, metric, likely_cause, suggested_action) VALUES (?, ?, ?, ?, ?, ?)",
             sample_alerts)
 
-    c.execute('''CREATE TABLE IF NOT EXISTS solar_data
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  timestamp TEXT,
-                  generation_kw REAL,
-                  is_anomaly INTEGER DEFAULT 0)''')
 
-    c.execute('''CREATE TABLE IF NOT EXISTS solar_alerts
+def _create_model_jobs(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS model_jobs
                  (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  timestamp TEXT,
-                  generation_kw REAL,
-                  deviation REAL,
-                  detected TEXT)''')
+                  kind TEXT,
+                  status TEXT,
+                  progress REAL DEFAULT 0,
+                  message TEXT,
+                  model_key TEXT,
+                  created TEXT,
+                  started TEXT,
+                  finished TEXT)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_model_jobs_status ON model_jobs (status)")
+
+
+def _create_solar_baseline(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS solar_baseline
+                 (day_of_year INTEGER,
+                  hour INTEGER,
+                  readings INTEGER,
+                  total_kw REAL,
+                  PRIMARY KEY (day_of_year, hour)) WITHOUT ROWID''')
+
+
+def _move_solar_data_to_telemetry(c):
+    """Copy solar_data into telemetry under the solar asset, then drop it
+
+    The series belongs to the first Solar asset (0 when there is none);
+    the choice is recorded in solar_meta so ingestion keeps using it.
+    Calendar columns are not copied since they derive from ts.
+    """
+    c.execute(TELEMETRY_SCHEMA)
+    asset_id = c.execute("SELECT COALESCE(MIN(id), 0) FROM assets WHERE type = 'Solar'").fetchone()[0]
+    c.execute("INSERT OR REPLACE INTO solar_meta (key, value) VALUES ('asset_id', ?)", (str(asset_id),))
+    c.execute("""INSERT OR IGNORE INTO telemetry (asset_id, ts, generation_kw, is_anomaly, anomaly_score)
+                 SELECT ?, CAST(strftime('%s', timestamp) AS INTEGER), generation_kw,
+                        COALESCE(is_anomaly, 0), anomaly_score
+                 FROM solar_data WHERE timestamp IS NOT NULL""", (asset_id,))
+    c.execute("DROP TABLE solar_data")
+
+
+def _create_telemetry_rollups(c):
+    """Hourly and daily per-asset aggregates, kept current by triggers on telemetry
+
+    Buckets are keyed by their UTC epoch start. Inserts fold into the
+    bucket and rescoring adjusts its anomaly count, all in the writer's own
+    transaction. Deletes are not propagated since min and max cannot be
+    undone; whoever deletes telemetry clears the matching buckets.
+    """
+    insert_steps, update_steps = [], []
+    for table, width in TELEMETRY_ROLLUPS:
+        c.execute(f'''CREATE TABLE IF NOT EXISTS {table}
+                     (asset_id INTEGER NOT NULL,
+                      bucket INTEGER NOT NULL,
+                      readings INTEGER NOT NULL,
+                      min_kw REAL,
+                      max_kw REAL,
+                      sum_kw REAL,
+                      anomalies INTEGER NOT NULL,
+                      PRIMARY KEY (asset_id, bucket)) WITHOUT ROWID''')
+        c.execute(f"DELETE FROM {table}")
+        c.execute(f"""INSERT INTO {table}
+                      SELECT asset_id, ts - ts % {width}, COUNT(*), MIN(generation_kw), MAX(generation_kw),
+                             SUM(generation_kw), SUM(is_anomaly)
+                      FROM telemetry GROUP BY asset_id, ts - ts % {width}""")
+        insert_steps.append(f"""
+            INSERT INTO {table} VALUES (NEW.asset_id, NEW.ts - NEW.ts % {width}, 1, NEW.generation_kw,
+                                        NEW.generation_kw, NEW.generation_kw, NEW.is_anomaly)
+            ON CONFLICT (asset_id, bucket) DO UPDATE SET
+                readings = readings + 1,
+                min_kw = min(min_kw, excluded.min_kw),
+                max_kw = max(max_kw, excluded.max_kw),
+                sum_kw = sum_kw + excluded.sum_kw,
+                anomalies = anomalies + excluded.anomalies;""")
+        update_steps.append(f"""
+            UPDATE {table} SET anomalies = anomalies + NEW.is_anomaly - OLD.is_anomaly
+            WHERE asset_id = NEW.asset_id AND bucket = NEW.ts - NEW.ts % {width};""")
+
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS telemetry_rollup_insert AFTER INSERT ON telemetry "
+              f"BEGIN {''.join(insert_steps)} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS telemetry_rollup_rescore AFTER UPDATE OF is_anomaly ON telemetry "
+              f"WHEN NEW.is_anomaly != OLD.is_anomaly BEGIN {''.join(update_steps)} END")
+
+
+def _create_table_versions(c):
+    """Per-table write counters, bumped by triggers in the writer's transaction"""
+    c.execute('''CREATE TABLE IF NOT EXISTS table_versions
+                 (name TEXT PRIMARY KEY,
+                  version INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID''')
+    for table in VERSIONED_TABLES:
+        c.execute("INSERT OR IGNORE INTO table_versions (name) VALUES (?)", (table,))
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            c.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} "
+                      f"BEGIN UPDATE table_versions SET version = version + 1 WHERE name = '{table}'; END")
+
+
+def _create_staged_scores(c):
+    """Scores written ahead of a deploy and swapped into telemetry in one short transaction"""
+    c.execute('''CREATE TABLE IF NOT EXISTS telemetry_staged_scores
+                 (asset_id INTEGER NOT NULL,
+                  ts INTEGER NOT NULL,
+                  is_anomaly INTEGER NOT NULL,
+                  anomaly_score REAL,
+                  PRIMARY KEY (asset_id, ts)) WITHOUT ROWID''')
+
+
+def _create_baseline_trigger(c):
+    """Keep solar_baseline current from telemetry inserts for the solar asset
+
+    Counting rows as they are inserted, rather than from what a run read,
+    means overlapping ingestion runs cannot count a reading twice: only the
+    run whose insert lands fires the trigger. Each insert also bumps
+    baseline_version so cached lookups reload. The baseline is rebuilt from
+    the stored readings once, here.
+    """
+    solar_asset = "(SELECT CAST(value AS INTEGER) FROM solar_meta WHERE key = 'asset_id')"
+    c.execute("DELETE FROM solar_baseline")
+    c.execute(f"""INSERT INTO solar_baseline (day_of_year, hour, readings, total_kw)
+                  SELECT CAST(strftime('%j', ts, 'unixepoch') AS INTEGER),
+                         CAST(strftime('%H', ts, 'unixepoch') AS INTEGER), COUNT(*), TOTAL(generation_kw)
+                  FROM telemetry WHERE asset_id = {solar_asset} GROUP BY 1, 2""")
+    c.execute("""INSERT INTO solar_meta (key, value) VALUES ('baseline_version', 1)
+                 ON CONFLICT (key) DO UPDATE SET value = value + 1""")
+    c.execute(f"""CREATE TRIGGER IF NOT EXISTS telemetry_baseline_insert AFTER INSERT ON telemetry
+                  WHEN NEW.asset_id = {solar_asset}
+                  BEGIN
+                      INSERT INTO solar_baseline (day_of_year, hour, readings, total_kw)
+                      VALUES (CAST(strftime('%j', NEW.ts, 'unixepoch') AS INTEGER),
+                              CAST(strftime('%H', NEW.ts, 'unixepoch') AS INTEGER), 1,
+                              COALESCE(NEW.generation_kw, 0))
+                      ON CONFLICT (day_of_year, hour) DO UPDATE SET
+                          readings = readings + 1,
+                          total_kw = total_kw + excluded.total_kw;
+                      INSERT INTO solar_meta (key, value) VALUES ('baseline_version', 1)
+                      ON CONFLICT (key) DO UPDATE SET value = value + 1;
+                  END""")
+
+
+def _add_model_job_owner(c):
+    """Record which process runs each job, so only jobs whose process is gone count as interrupted"""
+    c.execute("ALTER TABLE model_jobs ADD COLUMN owner TEXT")
+
+
+# Schema migrations, applied in order. PRAGMA user_version records the last
+# one applied; append new steps here rather than editing old ones.
+MIGRATIONS = [
+    (1, _create_base_tables),
+    (2, _upgrade_solar_data),
+    (3, _add_lookup_indexes),
+    (4, _seed_sample_data),
+    (5, _create_model_jobs),
+    (6, _create_solar_baseline),
+    (7, _move_solar_data_to_telemetry),
+    (8, _create_telemetry_rollups),
+    (9, _create_table_versions),
+    (10, _create_staged_scores),
+    (11, _create_baseline_trigger),
+    (12, _add_model_job_owner),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_bootstrapped = set()
+_bootstrap_lock = threading.Lock()
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Apply pending migrations in one write transaction
+
+    BEGIN IMMEDIATE takes the write lock before the version is re-read, so
+    concurrent processes apply each step exactly once.
+    """
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return
 
     conn.commit()
-    conn.close()
\ No newline at end of file
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = schema_version(conn)
+        for target, step in MIGRATIONS:
+            if target > version:
+                step(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def init_db():
+    conn = get_db_connection()
+    migrate(conn)
+    conn.close()
+
+
+def ensure_db(path=DB_PATH):
+    """Bootstrap the database once per process
+
+    After the first call this is a set lookup; the first call itself only
+    writes when PRAGMA user_version shows pending migrations.
+    """
+    if path in _bootstrapped:
+        return
+
+    with _bootstrap_lock:
+        if path not in _bootstrapped:
+            migrate(get_db_connection(path))
+            _bootstrapped.add(path)
+
+
+_query_cache = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+
+def table_versions(conn, tables):
+    placeholders = ', '.join('?' * len(tables))
+    rows = dict(conn.execute(f"SELECT name, version FROM table_versions WHERE name IN ({placeholders})",
+                             tuple(tables)).fetchall())
+    return tuple(rows.get(table) for table in tables)
+
+
+def cached_query(query, tables, params=(), path=DB_PATH):
+    """pd.read_sql through a shared cache keyed by query and parameters
+
+    ``tables`` lists every table the query reads, all from
+    VERSIONED_TABLES. An entry is reused only while their write counters
+    are unchanged, so a committed write to any of them is seen on the next
+    read. Versions are read before the query, so an entry is never newer
+    than its recorded versions. Callers get a copy they may modify.
+    """
+    key = (path, query, tuple(params))
+    conn = get_db_connection(path)
+    versions = table_versions(conn, tables)
+    with _query_cache_lock:
+        hit = _query_cache.get(key)
+        if hit is not None and hit[0] == versions:
+            _query_cache.move_to_end(key)
+            return hit[1].copy()
+
+    result = pd.read_sql(query, conn, params=params)
+    conn.close()
+    with _query_cache_lock:
+        _query_cache[key] = (versions, result)
+        _query_cache.move_to_end(key)
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+    return result.copy()
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from utils.ai_module import SOLAR_FEATURES, CHUNK_SIZE, preprocess_solar_data
+from utils.db import get_db_connection
+from utils.telemetry import solar_asset_id
+
+FEATURE_CACHE_DIR = "data/features"
+# Bump when feature engineering changes so old caches are never reused
+FEATURE_VERSION = 1
+
+
+def scaler_fingerprint(scaler):
+    """Hash of a fitted scaler's state"""
+    digest = hashlib.sha256()
+    for array in (scaler.mean_, scaler.scale_):
+        digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+    return digest.hexdigest()[:12]
+
+
+def telemetry_fingerprint(conn, asset_id):
+    """Hash of an asset's stored series, taken from its daily rollup so no raw rows are read"""
+    digest = hashlib.sha256()
+    for row in conn.execute("SELECT bucket, readings, sum_kw FROM telemetry_daily "
+                            "WHERE asset_id = ? ORDER BY bucket", (asset_id,)):
+        digest.update(repr(row).encode())
+    return digest.hexdigest()[:16]
+
+
+def feature_cache_path(scaler, fingerprint):
+    return os.path.join(FEATURE_CACHE_DIR, f"v{FEATURE_VERSION}-{fingerprint}-{scaler_fingerprint(scaler)}")
+
+
+def _prune_stale_caches(fingerprint):
+    """Delete caches built for another version of the stored series
+
+    Caches of the current series under other scalers are kept, as are
+    builds still in progress.
+    """
+    current = f"v{FEATURE_VERSION}-{fingerprint}-"
+    for name in os.listdir(FEATURE_CACHE_DIR):
+        if not name.startswith(current) and not name.endswith('.tmp'):
+            shutil.rmtree(os.path.join(FEATURE_CACHE_DIR, name), ignore_errors=True)
+
+
+def build_feature_cache(scaler, asset_id, chunksize=CHUNK_SIZE):
+    """Engineer and scale an asset's stored readings into memory-mapped .npy files
+
+    Rows are read from telemetry in time order inside one read
+    transaction, so the cache matches the fingerprint it is filed under,
+    and written straight into preallocated files, so memory is bounded by
+    the chunk size. Returns the cache directory.
+    """
+    conn = get_db_connection()
+    conn.commit()
+    conn.execute("BEGIN")
+    try:
+        fingerprint = telemetry_fingerprint(conn, asset_id)
+        cache_dir = feature_cache_path(scaler, fingerprint)
+        tmp_dir = f"{cache_dir}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        capacity = conn.execute("SELECT COUNT(*) FROM telemetry WHERE asset_id = ?", (asset_id,)).fetchone()[0]
+        X = np.lib.format.open_memmap(os.path.join(tmp_dir, 'features.npy'), mode='w+',
+                                      dtype=np.float32, shape=(capacity, len(SOLAR_FEATURES)))
+        timestamps = np.lib.format.open_memmap(os.path.join(tmp_dir, 'timestamps.npy'), mode='w+',
+                                               dtype=np.int64, shape=(capacity,))
+
+        rows = 0
+        for chunk in pd.read_sql("SELECT ts, generation_kw FROM telemetry WHERE asset_id = ? ORDER BY ts",
+                                 conn, params=(asset_id,), chunksize=chunksize):
+            stop = rows + len(chunk)
+            timestamps[rows:stop] = chunk['ts'].to_numpy(np.int64) * 1_000_000_000
+            chunk.insert(0, 'timestamp', pd.to_datetime(chunk.pop('ts'), unit='s', utc=True))
+            X[rows:stop] = preprocess_solar_data(chunk, scaler=scaler, compact=True)[0]
+            rows = stop
+    finally:
+        conn.rollback()
+        conn.close()
+    X.flush()
+    timestamps.flush()
+    del X, timestamps
+
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump({'version': FEATURE_VERSION, 'features': SOLAR_FEATURES, 'rows': rows}, f)
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.replace(tmp_dir, cache_dir)
+    _prune_stale_caches(fingerprint)
+    return cache_dir
+
+
+def feature_cache_dir(scaler, asset_id=None):
+    """Cache directory for the asset's stored series and the scaler, built if needed
+
+    ``asset_id`` defaults to the solar asset.
+    """
+    conn = get_db_connection()
+    asset_id = solar_asset_id(conn) if asset_id is None else asset_id
+    cache_dir = feature_cache_path(scaler, telemetry_fingerprint(conn, asset_id))
+    conn.close()
+    if not os.path.exists(os.path.join(cache_dir, 'meta.json')):
+        cache_dir = build_feature_cache(scaler, asset_id)
+    return cache_dir
+
+
+def load_feature_cache(cache_dir):
+    """Memory-mapped (features, timestamps) from a cache directory
+
+    Timestamps are UTC epoch nanoseconds. Every process that opens the
+    cache shares the same page-cache copy.
+    """
+    with open(os.path.join(cache_dir, 'meta.json')) as f:
+        rows = json.load(f)['rows']
+    X = np.load(os.path.join(cache_dir, 'features.npy'), mmap_mode='r')[:rows]
+    timestamps = np.load(os.path.join(cache_dir, 'timestamps.npy'), mmap_mode='r')[:rows]
+    return X, timestamps
+
+
+def open_feature_cache(scaler, asset_id=None):
+    """Memory-mapped (features, timestamps) for the stored series and scaler, building them if needed"""
+    return load_feature_cache(feature_cache_dir(scaler, asset_id))
@@ -0,0 +1,158 @@
+import copy
+import queue
+import threading
+import traceback
+from datetime import datetime
+
+import numpy as np
+
+from utils.ai_module import dataset_fingerprint
+from utils.batch_scoring import backfill_solar_data
+from utils.db import cached_query, get_db_connection
+from utils.feature_cache import open_feature_cache
+from utils.model_registry import load_model, get_model, register_model, model_key
+from utils.owners import process_owner, owner_is_alive
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+WARM_START_TREES = 50
+
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _now():
+    return datetime.now().strftime(TIMESTAMP_FORMAT)
+
+
+def _update_job(job_id, **fields):
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn = get_db_connection()
+    with conn:
+        conn.execute(f"UPDATE model_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+    conn.close()
+
+
+def serving_model_key():
+    """Registry key of the model whose scores the dashboards show"""
+    conn = get_db_connection()
+    row = conn.execute("SELECT value FROM solar_meta WHERE key = 'model_key'").fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def _retrain(job_id, extra_trees):
+    """Warm-start the serving model with extra trees fitted on the current data"""
+    key = serving_model_key()
+    pair = load_model(key) if key else None
+    scaler, model = pair if pair is not None else get_model()
+    _update_job(job_id, progress=0.1, message="Loading features")
+
+    X, _ = open_feature_cache(scaler)
+    _update_job(job_id, progress=0.3, message=f"Fitting {extra_trees} new trees")
+
+    # The existing trees are kept; only the new ones are fitted
+    model = copy.deepcopy(model)
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + extra_trees)
+    model.fit(np.asarray(X))
+
+    new_key = f"{model_key(dataset_fingerprint(), model.contamination, model.n_estimators)}-job{job_id}"
+    register_model(new_key, scaler, model)
+    return new_key, f"Trained {model.n_estimators} trees"
+
+
+def _deploy(job_id, key):
+    """Rescore stored readings with ``key`` and make it the serving model in one commit"""
+    _update_job(job_id, progress=0.2, message="Rescoring stored readings")
+    rows = backfill_solar_data(key, atomic=True)
+    return key, f"Serving {key}, rescored {rows} rows"
+
+
+def _run(job_id, kind, argument):
+    _update_job(job_id, status='running', started=_now())
+    try:
+        key, message = _retrain(job_id, argument) if kind == 'retrain' else _deploy(job_id, argument)
+        _update_job(job_id, status='succeeded', progress=1.0, message=message, model_key=key, finished=_now())
+    except Exception as e:
+        get_db_connection().rollback()
+        traceback.print_exc()
+        _update_job(job_id, status='failed', message=str(e), finished=_now())
+
+
+def _work():
+    while True:
+        job_id, kind, argument = _queue.get()
+        try:
+            _run(job_id, kind, argument)
+        finally:
+            _queue.task_done()
+
+
+def _fail_interrupted_jobs():
+    """Fail queued or running jobs whose owning process is gone, since they will never finish
+
+    Jobs owned by other live processes sharing the database are left alone.
+    """
+    conn = get_db_connection()
+    owners = [row[0] for row in conn.execute("SELECT DISTINCT owner FROM model_jobs "
+                                             "WHERE status IN ('queued', 'running')")]
+    gone = [owner for owner in owners if not owner_is_alive(owner)]
+    if gone:
+        with conn:
+            conn.executemany("UPDATE model_jobs SET status = 'failed', message = 'Interrupted', finished = ? "
+                             "WHERE status IN ('queued', 'running') AND owner IS ?",
+                             [(_now(), owner) for owner in gone])
+    conn.close()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work, name="model-jobs", daemon=True)
+            _worker.start()
+
+
+def _submit(kind, argument, model=None):
+    _ensure_worker()
+    conn = get_db_connection()
+    with conn:
+        job_id = conn.execute("INSERT INTO model_jobs (kind, status, message, model_key, created, owner) "
+                              "VALUES (?, 'queued', 'Waiting for worker', ?, ?, ?)",
+                              (kind, model, _now(), process_owner())).lastrowid
+    conn.close()
+
+    _queue.put((job_id, kind, argument))
+    return job_id
+
+
+def submit_retrain(extra_trees=WARM_START_TREES):
+    """Queue a warm-start retrain of the serving model; returns the job id"""
+    return _submit('retrain', extra_trees)
+
+
+def submit_deploy(key=None):
+    """Queue a hot swap to ``key``, defaulting to the newest retrained model
+
+    Returns the job id, or None when there is nothing to deploy.
+    """
+    if key is None:
+        latest = latest_trained_model()
+        if latest is None or latest == serving_model_key():
+            return None
+        key = latest
+    return _submit('deploy', key, key)
+
+
+def latest_trained_model():
+    conn = get_db_connection()
+    row = conn.execute("SELECT model_key FROM model_jobs WHERE kind = 'retrain' AND status = 'succeeded' "
+                       "ORDER BY id DESC LIMIT 1").fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def list_jobs(limit=20):
+    """Most recent model jobs, newest first"""
+    _fail_interrupted_jobs()
+    return cached_query("SELECT * FROM model_jobs ORDER BY id DESC LIMIT ?", ['model_jobs'], (limit,))
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+import threading
+
+import joblib
+
+from utils.ai_module import SOLAR_DATA_PATH, dataset_fingerprint, train_from_chunks, iter_solar_chunks
+
+MODEL_DIR = "models"
+
+# Fitted (scaler, model) pairs shared by every session in this process
+_models = {}
+_lock = threading.Lock()
+
+
+def model_key(fingerprint, contamination=0.05, n_estimators=100):
+    """Registry key for a dataset fingerprint and hyperparameters"""
+    params = json.dumps({'contamination': contamination, 'n_estimators': n_estimators}, sort_keys=True)
+    return f"{fingerprint}-{hashlib.sha256(params.encode()).hexdigest()[:8]}"
+
+
+def model_path(key):
+    return os.path.join(MODEL_DIR, f"solar_{key}.joblib")
+
+
+def _save(key, scaler, model):
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    path = model_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump((scaler, model), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def register_model(key, scaler, model):
+    """Persist a fitted pair under ``key`` and serve it from this process"""
+    with _lock:
+        _save(key, scaler, model)
+        _models[key] = (scaler, model)
+
+
+def load_model(key):
+    """Return a registered (scaler, model) pair by key, or None if it was never trained"""
+    pair = _models.get(key)
+    if pair is not None:
+        return pair
+
+    with _lock:
+        pair = _models.get(key)
+        if pair is None and os.path.exists(model_path(key)):
+            pair = joblib.load(model_path(key))
+            _models[key] = pair
+        return pair
+
+
+def get_model(path=SOLAR_DATA_PATH, contamination=0.05, n_estimators=100):
+    """Return the fitted (scaler, model) pair for a dataset
+
+    Looks in the in-process registry first, then on disk, and only trains
+    when neither has a model for this fingerprint and hyperparameters.
+    """
+    key = model_key(dataset_fingerprint(path), contamination, n_estimators)
+
+    pair = load_model(key)
+    if pair is not None:
+        return pair
+
+    with _lock:
+        pair = _models.get(key)
+        if pair is not None:
+            return pair
+
+        scaler, model = train_from_chunks(iter_solar_chunks(path), contamination, n_estimators)
+        pair = (scaler, model)
+        _save(key, scaler, model)
+
+        _models[key] = pair
+        return pair
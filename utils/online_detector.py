@@ -0,0 +1,128 @@
+import math
+import sys
+from collections import deque
+from datetime import datetime
+
+import pandas as pd
+
+from utils.db import get_db_connection
+from utils.telemetry import solar_asset_id
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class _SlidingStats:
+    """Mean and standard deviation of the last ``size`` values, updated in O(1)"""
+
+    def __init__(self, size):
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, value):
+        if len(self.values) == self.values.maxlen:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+    def mean(self):
+        return self.total / len(self.values)
+
+    def std(self):
+        n = len(self.values)
+        return math.sqrt(max(self.total_sq / n - (self.total / n) ** 2, 0.0))
+
+
+def record_solar_alert(timestamp, generation_kw, deviation):
+    conn = get_db_connection()
+    with conn:
+        conn.execute("INSERT INTO solar_alerts (timestamp, generation_kw, deviation, detected) VALUES (?, ?, ?, ?)",
+                     (timestamp.strftime(TIMESTAMP_FORMAT), generation_kw, deviation,
+                      datetime.now().strftime(TIMESTAMP_FORMAT)))
+    conn.close()
+
+
+class OnlineSolarDetector:
+    """Scores solar readings one at a time against recent readings at the same time of day
+
+    Each of the ``slots_per_day`` daily slots keeps a sliding window of the
+    last ``window`` readings, so every update is O(1). A reading is
+    anomalous when it is more than ``threshold`` standard deviations from
+    its slot mean; ``min_std`` keeps flat night-time slots from flagging
+    tiny changes. Anomalies are passed to ``on_alert``, which by default
+    writes a solar_alerts row.
+    """
+
+    def __init__(self, window=14, threshold=3.5, min_samples=5, min_std=1000.0,
+                 slots_per_day=48, on_alert=record_solar_alert):
+        self.window = window
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.min_std = min_std
+        self.slots_per_day = slots_per_day
+        self.on_alert = on_alert
+        self._slots = {}
+
+    def _slot(self, timestamp):
+        minute = timestamp.hour * 60 + timestamp.minute
+        slot = minute * self.slots_per_day // 1440
+        if slot not in self._slots:
+            self._slots[slot] = _SlidingStats(self.window)
+        return self._slots[slot]
+
+    def update(self, timestamp, generation_kw, emit=True):
+        """Score one reading, then add it to its window
+
+        Returns ``(is_anomaly, z_score)``; the score is None until the slot
+        has ``min_samples`` readings.
+        """
+        timestamp = pd.Timestamp(timestamp)
+        stats = self._slot(timestamp)
+
+        is_anomaly, z_score = False, None
+        if len(stats.values) >= self.min_samples:
+            expected = stats.mean()
+            z_score = (generation_kw - expected) / max(stats.std(), self.min_std)
+            is_anomaly = abs(z_score) > self.threshold
+            if is_anomaly and emit and self.on_alert is not None:
+                self.on_alert(timestamp, generation_kw, generation_kw - expected)
+
+        stats.push(generation_kw)
+        return is_anomaly, z_score
+
+    def prime(self, readings):
+        """Fill the windows from historical readings without emitting alerts"""
+        readings = readings.sort_values('timestamp')
+        for timestamp, generation_kw in zip(pd.to_datetime(readings['timestamp']), readings['generation_kw']):
+            self.update(timestamp, float(generation_kw), emit=False)
+
+
+def recent_solar_readings(days=14):
+    """Stored readings from the last ``days`` days, for priming a detector"""
+    conn = get_db_connection()
+    asset_id = solar_asset_id(conn)
+    readings = pd.read_sql("""
+        SELECT ts, generation_kw FROM telemetry
+        WHERE asset_id = ? AND ts >= (SELECT MAX(ts) FROM telemetry WHERE asset_id = ?) - ?
+        ORDER BY ts
+    """, conn, params=(asset_id, asset_id, days * 86400))
+    conn.close()
+    readings.insert(0, 'timestamp', pd.to_datetime(readings.pop('ts'), unit='s'))
+    return readings
+
+
+if __name__ == "__main__":
+    # Score "timestamp,generation_kw" lines from stdin as they arrive
+    detector = OnlineSolarDetector()
+    detector.prime(recent_solar_readings(detector.window))
+    for line in sys.stdin:
+        try:
+            raw_timestamp, raw_generation = line.strip().split(',')
+            is_anomaly, z_score = detector.update(raw_timestamp, float(raw_generation))
+        except ValueError:
+            continue
+        if is_anomaly:
+            print(f"Anomaly at {raw_timestamp}: {raw_generation} kW (z={z_score:.1f})", flush=True)
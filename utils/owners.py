@@ -0,0 +1,43 @@
+import os
+import socket
+
+
+def process_owner():
+    """Token naming this process in rows it owns, such as running jobs"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _pid_is_alive(pid):
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        # SYNCHRONIZE access; the handle stays unsignalled while the process runs
+        handle = kernel32.OpenProcess(0x00100000, False, pid)
+        if not handle:
+            return kernel32.GetLastError() == 5  # access denied: it exists
+        try:
+            return kernel32.WaitForSingleObject(handle, 0) == 0x102
+        finally:
+            kernel32.CloseHandle(handle)
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def owner_is_alive(owner):
+    """Whether the process behind a process_owner() token is still running
+
+    Processes on other hosts cannot be checked and count as alive; a
+    missing owner, as on rows written before owners were recorded, does not.
+    """
+    if not owner:
+        return False
+    host, _, pid = owner.rpartition(':')
+    if host != socket.gethostname():
+        return True
+    return _pid_is_alive(int(pid))
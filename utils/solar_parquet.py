@@ -0,0 +1,101 @@
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+PARQUET_DIR = "data/solar_parquet"
+FINGERPRINT_FILE = "_source_fingerprint"
+
+SOLAR_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('us', tz='UTC')),
+    ('generation_kw', pa.float32()),
+])
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.date32())]), flavor='hive')
+
+
+def _to_table(chunk):
+    timestamps = pd.to_datetime(chunk['timestamp'], utc=True)
+    return pa.table({
+        'timestamp': pa.array(timestamps, type=SOLAR_SCHEMA.field('timestamp').type),
+        'generation_kw': pa.array(chunk['generation_kw'].to_numpy('float32')),
+        'date': pa.array(timestamps.dt.date, type=pa.date32()),
+    })
+
+
+def build_parquet_cache(chunks, fingerprint, out_dir=PARQUET_DIR):
+    """Write raw solar chunks as day-partitioned Parquet
+
+    The dataset is built next to ``out_dir`` and swapped in once complete,
+    tagged with the source ``fingerprint`` so readers can tell if it is stale.
+    """
+    tmp_dir = f"{out_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    for i, chunk in enumerate(chunks):
+        ds.write_dataset(_to_table(chunk), tmp_dir, format='parquet',
+                         partitioning=PARTITIONING,
+                         basename_template=f"part-{i}-{{i}}.parquet",
+                         existing_data_behavior='overwrite_or_ignore')
+
+    os.makedirs(tmp_dir, exist_ok=True)
+    with open(os.path.join(tmp_dir, FINGERPRINT_FILE), 'w') as f:
+        f.write(fingerprint)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+
+
+def cache_fingerprint(out_dir=PARQUET_DIR):
+    """Source fingerprint the cache was built from, or None if there is no cache"""
+    try:
+        with open(os.path.join(out_dir, FINGERPRINT_FILE)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def to_utc(value):
+    timestamp = pd.Timestamp(value)
+    return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+
+
+def _range_filter(start=None, end=None):
+    """Partition filter on ``date`` plus an exact filter on ``timestamp``
+
+    Both bounds are exclusive, matching high-water mark reads.
+    """
+    expression = None
+    if start is not None:
+        start = to_utc(start)
+        expression = (ds.field('date') >= start.date()) & (ds.field('timestamp') > start)
+    if end is not None:
+        end = to_utc(end)
+        upper = (ds.field('date') <= end.date()) & (ds.field('timestamp') < end)
+        expression = upper if expression is None else expression & upper
+    return expression
+
+
+def _dataset(out_dir):
+    return ds.dataset(out_dir, format='parquet', partitioning=PARTITIONING,
+                      exclude_invalid_files=True, ignore_prefixes=['_', '.'])
+
+
+def read_solar_range(start=None, end=None, columns=None, out_dir=PARQUET_DIR):
+    """Load solar readings in (start, end), reading only the matching day files and columns"""
+    columns = columns or SOLAR_SCHEMA.names
+    df = _dataset(out_dir).to_table(columns=columns, filter=_range_filter(start, end)).to_pandas()
+    if 'timestamp' in columns:
+        df = df.sort_values('timestamp', ignore_index=True)
+    return df
+
+
+def iter_solar_batches(start=None, end=None, columns=None, batch_size=100_000, out_dir=PARQUET_DIR):
+    """Stream solar readings in (start, end) as DataFrames of at most ``batch_size`` rows"""
+    columns = columns or SOLAR_SCHEMA.names
+    scanner = _dataset(out_dir).scanner(columns=columns, filter=_range_filter(start, end),
+                                        batch_size=batch_size)
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield batch.to_pandas()
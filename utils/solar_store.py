@@ -0,0 +1,146 @@
+import threading
+import time
+
+from utils.db import get_db_connection
+from utils.owners import process_owner, owner_is_alive
+from utils.telemetry import read_telemetry, read_generation_series, anomaly_counts, solar_asset_id
+from utils.ai_module import dataset_fingerprint
+from utils.update_solar_data import update_solar_data
+
+# Seconds to wait after a failed rescore before retrying the same source data
+RESCORE_RETRY_SECONDS = 300
+
+_rescore_lock = threading.Lock()
+_rescore_thread = None
+
+
+def stored_fingerprint():
+    """Fingerprint of the source data the stored solar scores were computed from"""
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT value FROM solar_meta WHERE key = 'source_fingerprint'").fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def is_rescoring():
+    """Whether any process sharing the database is rescoring the solar data"""
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT value FROM solar_meta WHERE key = 'rescore_owner'").fetchone()
+    finally:
+        conn.close()
+    return row is not None and owner_is_alive(row[0])
+
+
+def _may_claim(conn, fingerprint):
+    meta = dict(conn.execute("SELECT key, value FROM solar_meta WHERE key IN "
+                             "('source_fingerprint', 'rescore_owner', 'rescore_failed')").fetchall())
+    failed_fingerprint, _, failed_at = meta.get('rescore_failed', '').partition(' ')
+    return (meta.get('source_fingerprint') != fingerprint
+            and not owner_is_alive(meta.get('rescore_owner'))
+            and not (failed_fingerprint == fingerprint
+                     and time.time() - float(failed_at) < RESCORE_RETRY_SECONDS))
+
+
+def _claim_rescore(fingerprint):
+    """Record this process as the rescorer unless another one holds the claim
+
+    The claim is re-checked and taken under BEGIN IMMEDIATE, so of several
+    server processes only one starts a rescore. A claim left by a process
+    that has exited is taken over. After a failed run the same source data
+    is not retried for RESCORE_RETRY_SECONDS.
+    """
+    conn = get_db_connection()
+    # Plain read first, so renders during a rescore or a backoff take no write lock
+    if not _may_claim(conn, fingerprint):
+        conn.close()
+        return False
+
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        claimed = _may_claim(conn, fingerprint)
+        if claimed:
+            conn.execute("INSERT OR REPLACE INTO solar_meta (key, value) VALUES ('rescore_owner', ?)",
+                         (process_owner(),))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return claimed
+
+
+def _rescore(fingerprint):
+    """Run ingestion under the claim, then release it and record a failure for backoff"""
+    succeeded = False
+    try:
+        succeeded = update_solar_data()
+    finally:
+        conn = get_db_connection()
+        with conn:
+            conn.execute("DELETE FROM solar_meta WHERE key = 'rescore_owner'")
+            if succeeded:
+                conn.execute("DELETE FROM solar_meta WHERE key = 'rescore_failed'")
+            else:
+                conn.execute("INSERT OR REPLACE INTO solar_meta (key, value) VALUES ('rescore_failed', ?)",
+                             (f"{fingerprint} {time.time()}",))
+        conn.close()
+
+
+def ensure_fresh():
+    """Start a background rescore if the source data changed since the last one
+
+    Returns True when the stored scores match the current source data.
+    """
+    global _rescore_thread
+
+    fingerprint = dataset_fingerprint()
+    if stored_fingerprint() == fingerprint:
+        return True
+
+    with _rescore_lock:
+        if (_rescore_thread is None or not _rescore_thread.is_alive()) and _claim_rescore(fingerprint):
+            _rescore_thread = threading.Thread(target=_rescore, args=(fingerprint,), name="solar-rescore",
+                                               daemon=True)
+            _rescore_thread.start()
+    return False
+
+
+def _with_calendar(df):
+    df.insert(2, 'hour', df['timestamp'].dt.hour)
+    df.insert(3, 'day_of_week', df['timestamp'].dt.dayofweek)
+    return df
+
+
+def get_recent_anomalies(limit=10):
+    """Most recent anomalous readings, newest first"""
+    return _with_calendar(read_telemetry(solar_asset_id(), columns=('generation_kw', 'anomaly_score'),
+                                         where='is_anomaly = 1', order='DESC', limit=limit))
+
+
+def get_solar_anomalies():
+    """Every anomalous reading, oldest first"""
+    return _with_calendar(read_telemetry(solar_asset_id(), columns=('generation_kw', 'anomaly_score'),
+                                         where='is_anomaly = 1'))
+
+
+def get_anomaly_counts():
+    """Normal and anomalous reading counts under the serving model's labels"""
+    return anomaly_counts(solar_asset_id())
+
+
+def get_solar_results(start=None, end=None):
+    """Scored solar readings in [start, end), oldest first"""
+    return _with_calendar(read_telemetry(solar_asset_id(), start, end))
+
+
+def get_generation_series(start=None, end=None):
+    """Solar generation for [start, end) from the coarsest table that still fits the chart
+
+    Returns ``(frame, resolution)``; see read_generation_series.
+    """
+    return read_generation_series(solar_asset_id(), start, end)
@@ -0,0 +1,113 @@
+import pandas as pd
+
+from utils.db import TELEMETRY_ROLLUPS, get_db_connection
+
+TELEMETRY_COLUMNS = ['asset_id', 'ts', 'generation_kw', 'is_anomaly', 'anomaly_score']
+
+# Most points a chart or report series is read at
+MAX_SERIES_POINTS = 10_000
+
+_EPOCH = pd.Timestamp(0, tz='UTC')
+
+
+def to_epoch(timestamps):
+    """UTC epoch seconds for timestamps; naive values are taken as UTC"""
+    timestamps = pd.to_datetime(pd.Series(timestamps), utc=True)
+    return ((timestamps - _EPOCH) // pd.Timedelta(seconds=1)).to_numpy('int64')
+
+
+def _bound(value):
+    return None if value is None else int(to_epoch([value])[0])
+
+
+def solar_asset_id(conn=None):
+    """Asset the solar generation series is stored under"""
+    own_conn = conn is None
+    conn = conn or get_db_connection()
+    row = conn.execute("SELECT value FROM solar_meta WHERE key = 'asset_id'").fetchone()
+    if own_conn:
+        conn.close()
+    return int(row[0]) if row else 0
+
+
+def read_telemetry(asset_id, start=None, end=None, columns=('generation_kw', 'is_anomaly', 'anomaly_score'),
+                   where='', order='ASC', limit=-1):
+    """One asset's readings in [start, end) as a frame with a naive UTC ``timestamp``
+
+    The bounds become a primary-key range, so only the pages holding that
+    asset's window are read. ``where`` adds an extra SQL condition.
+    """
+    conn = get_db_connection()
+    try:
+        df = pd.read_sql(f"""
+            SELECT ts, {', '.join(columns)} FROM telemetry
+            WHERE asset_id = ? AND ts >= COALESCE(?, -9223372036854775808)
+              AND ts < COALESCE(?, 9223372036854775807) {f'AND {where}' if where else ''}
+            ORDER BY ts {order}
+            LIMIT ?
+        """, conn, params=(asset_id, _bound(start), _bound(end), limit))
+    finally:
+        conn.close()
+    df.insert(0, 'timestamp', pd.to_datetime(df.pop('ts'), unit='s'))
+    return df
+
+
+def anomaly_counts(asset_id):
+    """Readings per ``is_anomaly`` value, summed from the daily rollup so no raw rows are read"""
+    conn = get_db_connection()
+    try:
+        readings, anomalies = conn.execute("SELECT COALESCE(SUM(readings), 0), COALESCE(SUM(anomalies), 0) "
+                                           "FROM telemetry_daily WHERE asset_id = ?", (asset_id,)).fetchone()
+    finally:
+        conn.close()
+    return pd.Series({0: readings - anomalies, 1: anomalies}, name='count').rename_axis('is_anomaly')
+
+
+def _estimated_rows(conn, asset_id, start, end):
+    """Rows each resolution would return for the window, finest first
+
+    The raw count comes from the daily rollup, so no raw rows are read.
+    """
+    span = conn.execute("""
+        SELECT MIN(bucket), MAX(bucket) + 86400, SUM(readings) FROM telemetry_daily
+        WHERE asset_id = ? AND bucket >= COALESCE(? - ? % 86400, -9223372036854775808)
+          AND bucket < COALESCE(?, 9223372036854775807)
+    """, (asset_id, start, start, end)).fetchone()
+    if span[2] is None:
+        return [('telemetry', 0)]
+    first = span[0] if start is None else max(start, span[0])
+    last = span[1] if end is None else min(end, span[1])
+    return [('telemetry', span[2])] + [(table, -(-(last - first) // width)) for table, width in TELEMETRY_ROLLUPS]
+
+
+def read_generation_series(asset_id, start=None, end=None, max_points=MAX_SERIES_POINTS):
+    """Generation for [start, end) at the finest resolution within ``max_points``
+
+    Returns ``(frame, resolution)`` where resolution is the table read:
+    raw telemetry or one of the rollups. Frames have ``timestamp``,
+    ``generation_kw`` (the bucket mean for rollups), ``min_kw``,
+    ``max_kw`` and ``anomalies``, whatever the resolution.
+    """
+    start, end = _bound(start), _bound(end)
+    conn = get_db_connection()
+    try:
+        estimates = _estimated_rows(conn, asset_id, start, end)
+        table = next((table for table, rows in estimates if rows <= max_points), estimates[-1][0])
+        if table == 'telemetry':
+            query = """SELECT ts, generation_kw, generation_kw AS min_kw, generation_kw AS max_kw,
+                              is_anomaly AS anomalies
+                       FROM telemetry WHERE asset_id = ? AND ts >= COALESCE(?, -9223372036854775808)
+                         AND ts < COALESCE(?, 9223372036854775807) ORDER BY ts"""
+            params = (asset_id, start, end)
+        else:
+            width = dict(TELEMETRY_ROLLUPS)[table]
+            query = f"""SELECT bucket AS ts, sum_kw / readings AS generation_kw, min_kw, max_kw, anomalies
+                        FROM {table} WHERE asset_id = ?
+                          AND bucket >= COALESCE(? - ? % {width}, -9223372036854775808)
+                          AND bucket < COALESCE(?, 9223372036854775807) ORDER BY bucket"""
+            params = (asset_id, start, start, end)
+        df = pd.read_sql(query, conn, params=params)
+    finally:
+        conn.close()
+    df.insert(0, 'timestamp', pd.to_datetime(df.pop('ts'), unit='s'))
+    return df, table
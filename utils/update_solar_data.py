@@ -1,22 +1,101 @@
-import pandas as pd
-from utils.ai_module import preprocess_solar_data, train_isolation_forest, detect_anomalies
-from utils.db import get_db_connection
+import sys
 
+from utils.ai_module import (SOLAR_DATA_PATH, CHUNK_SIZE, dataset_fingerprint, iter_solar_chunks,
+                             preprocess_solar_data, memory_footprint, detect_anomalies, convert_solar_to_parquet)
+from utils.db import TELEMETRY_ROLLUPS, get_db_connection, migrate
+from utils.model_registry import model_key, load_model, get_model
+from utils.telemetry import TELEMETRY_COLUMNS, solar_asset_id, to_epoch
 
-def update_solar_data():
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+BATCH_SIZE = 5000
+
+
+def _high_water_mark(conn, asset_id):
+    """Latest timestamp of the last completed run, falling back to the table contents"""
+    row = conn.execute("SELECT value FROM solar_meta WHERE key = 'high_water_mark'").fetchone()
+    if row:
+        return row[0]
+    return conn.execute("SELECT datetime(MAX(ts), 'unixepoch') FROM telemetry WHERE asset_id = ?",
+                        (asset_id,)).fetchone()[0]
+
+
+def _serving_model(conn, fingerprint, full):
+    """Model used for scoring: the one already serving, unless a full rescore was asked for"""
+    if not full:
+        row = conn.execute("SELECT value FROM solar_meta WHERE key = 'model_key'").fetchone()
+        pair = load_model(row[0]) if row else None
+        if pair is not None:
+            return row[0], pair
+
+    return model_key(fingerprint), get_model()
+
+
+def _insert_batches(conn, rows):
+    columns = ', '.join(TELEMETRY_COLUMNS)
+    placeholders = ', '.join('?' * len(TELEMETRY_COLUMNS))
+    insert_sql = f"INSERT OR IGNORE INTO telemetry ({columns}) VALUES ({placeholders})"
+    for start in range(0, len(rows), BATCH_SIZE):
+        with conn:
+            conn.executemany(insert_sql, rows[start:start + BATCH_SIZE])
+
+
+def update_solar_data(full=False, chunksize=CHUNK_SIZE):
+    """Score new solar readings and append them to the solar asset's telemetry
+
+    Source rows are streamed in chunks of ``chunksize`` rows, from the Parquet
+    cache when it is current; only rows newer than the high-water mark are
+    scored and inserted, so memory is bounded by the chunk size. The mark
+    advances only once the whole pass has committed, and re-inserted rows
+    are ignored, so an interrupted run can be retried.
+    With ``full=True`` the table is cleared and every row is rescored with a
+    model fitted on the current data.
+    """
     try:
-        # Load and process data
-        solar_data = pd.read_csv("utils/cleaned_solar_data_reduced.csv")
-        X_scaled, scaler, processed_data = preprocess_solar_data(solar_data)
-        model = train_isolation_forest(X_scaled)
-        results = detect_anomalies(model, X_scaled, processed_data)
+        fingerprint = dataset_fingerprint()
+        conn = get_db_connection()
+        migrate(conn)
+
+        asset_id = solar_asset_id(conn)
+        key, (scaler, model) = _serving_model(conn, fingerprint, full)
+        if full:
+            with conn:
+                conn.execute("DELETE FROM telemetry WHERE asset_id = ?", (asset_id,))
+                for table, _ in TELEMETRY_ROLLUPS:
+                    conn.execute(f"DELETE FROM {table} WHERE asset_id = ?", (asset_id,))
+                # The baseline trigger refills it as rows are re-inserted
+                conn.execute("DELETE FROM solar_baseline")
+                conn.execute("UPDATE solar_meta SET value = value + 1 WHERE key = 'baseline_version'")
+                conn.execute("DELETE FROM solar_meta WHERE key = 'high_water_mark'")
+        high_water_mark = _high_water_mark(conn, asset_id)
+        latest = high_water_mark
+        scored, peak_bytes = 0, 0
+
+        # Load and process only the rows past the high-water mark, one chunk at a time
+        for chunk in iter_solar_chunks(SOLAR_DATA_PATH, chunksize, start=high_water_mark):
+            X_scaled, _, processed = preprocess_solar_data(chunk, scaler=scaler, compact=True)
+            peak_bytes = max(peak_bytes, memory_footprint(X_scaled, processed)['total'])
+            timestamps = processed['timestamp'].dt.strftime(TIMESTAMP_FORMAT)
+            if high_water_mark is not None:
+                new_rows = (timestamps > high_water_mark).to_numpy()
+                processed, X_scaled, timestamps = processed[new_rows], X_scaled[new_rows], timestamps[new_rows]
+            if processed.empty:
+                continue
+
+            results = detect_anomalies(model, X_scaled, processed.copy())
+            results = results.assign(asset_id=asset_id, ts=to_epoch(results['timestamp']))[TELEMETRY_COLUMNS]
+            _insert_batches(conn, list(results.itertuples(index=False, name=None)))
+            latest = max(latest or '', timestamps.max())
+            scored += len(processed)
 
         # Save to database
-        conn = get_db_connection()
-        results.to_sql('solar_data', conn, if_exists='replace', index=False)
-        conn.commit()
+        meta = [('source_fingerprint', fingerprint), ('model_key', key)]
+        if latest is not None:
+            meta.append(('high_water_mark', latest))
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO solar_meta (key, value) VALUES (?, ?)", meta)
         conn.close()
 
+        print(f"Scored {scored} new solar readings; largest preprocessed chunk held {peak_bytes / 2**20:.2f} MiB")
         return True
     except Exception as e:
         print(f"Error updating solar data: {str(e)}")
@@ -24,4 +103,6 @@ def update_solar_data():
 
 
 if __name__ == "__main__":
-    update_solar_data()
\ No newline at end of file
+    if '--parquet' in sys.argv:
+        convert_solar_to_parquet()
+    update_solar_data(full='--full' in sys.argv)
@@ -0,0 +1,107 @@
+import atexit
+import queue
+import threading
+import traceback
+from concurrent.futures import Future
+
+from utils.db import get_db_connection
+
+# Most queued writes folded into one transaction
+GROUP_COMMIT_SIZE = 256
+
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _apply(conn, query, params, many):
+    """Run one queued write inside a savepoint so its failure spares the rest of the group"""
+    conn.execute("SAVEPOINT queued_write")
+    try:
+        cursor = conn.executemany(query, params) if many else conn.execute(query, params)
+    except Exception:
+        conn.execute("ROLLBACK TO queued_write")
+        conn.execute("RELEASE queued_write")
+        raise
+    conn.execute("RELEASE queued_write")
+    return cursor.rowcount
+
+
+def _commit_group(conn, group):
+    outcomes = []
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for future, query, params, many in group:
+            try:
+                outcomes.append((future, _apply(conn, query, params, many), None))
+            except Exception as e:
+                outcomes.append((future, None, e))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        for future, *_ in group:
+            future.set_exception(e)
+        return
+
+    # Callers hear back only once their write is committed
+    for future, rowcount, error in outcomes:
+        if error is None:
+            future.set_result(rowcount)
+        else:
+            future.set_exception(error)
+
+
+def _work():
+    conn = get_db_connection()
+    while True:
+        group = [_queue.get()]
+        while len(group) < GROUP_COMMIT_SIZE:
+            try:
+                group.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _commit_group(conn, group)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            for _ in group:
+                _queue.task_done()
+
+
+def _ensure_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_work, name="db-writer", daemon=True)
+            _writer.start()
+
+
+def _submit(query, params, many):
+    future = Future()
+    _ensure_writer()
+    _queue.put((future, query, params, many))
+    return future
+
+
+def submit_write(query, params=()):
+    """Queue one statement for the writer thread
+
+    Returns a Future resolving to the affected row count once the group
+    it joined has committed, or raising the statement's error.
+    """
+    return _submit(query, tuple(params), False)
+
+
+def submit_write_many(query, seq_of_params):
+    """Queue an executemany; it commits or fails as a unit"""
+    return _submit(query, [tuple(params) for params in seq_of_params], True)
+
+
+def flush():
+    """Block until every queued write has been committed or failed"""
+    if _writer is not None and _writer.is_alive():
+        _queue.join()
+
+
+atexit.register(flush)